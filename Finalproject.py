@@ -3,13 +3,28 @@ import random
 import sys
 import os
 import math
+import time
+import json
+import csv
+import copy
+import struct
+import threading
+import zlib
+import weakref
+from array import array
+from collections import OrderedDict, deque
 
-pygame.init()
+try:
+    import numpy as np
+except ImportError:  # Falls back to per-object particles
+    np = None
+
+try:
+    from pygame._sdl2 import video as sdl2_video
+except ImportError:  # Only the software renderer then
+    sdl2_video = None
 
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Phillips Exeter Academy - Dorm Dash")
-clock = pygame.time.Clock()
 
 # Polished color palette
 WHITE = (248, 248, 248)           
@@ -35,36 +50,662 @@ GRID_SIZE = 100
 GRID_COLS = WIDTH // GRID_SIZE
 GRID_ROWS = HEIGHT // GRID_SIZE
 
+# Procedural mazes: MAZE_CELL px from one wall line to the next, so
+# corridors are MAZE_CELL - MAZE_WALL wide
+MAZE_CELL = 100
+MAZE_WALL = 20
+PROCEDURAL_MAZE = 0  # current_maze value for generated layouts
+MAZE_CACHE_DIR = os.environ.get("MAZERUN_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "mazerun"))
+# Bump when the cache file format or generate_maze() output for a given
+# seed changes, so stale cached mazes are not loaded
+MAZE_CACHE_VERSION = 1
+FONT_CACHE_PATH = os.path.join(MAZE_CACHE_DIR, "fonts.json")
+SEAL_IMAGE = "/mnt/user-data/uploads/Screenshot_2025-11-17_at_8_08_42_PM.png"
+
+SIM_RATE = 60  # Game.update() calls per simulated second
+RENDER_FPS = 60
+MAX_CATCH_UP_STEPS = 5  # Per rendered frame, before the backlog is dropped
+FAST_FORWARD = 4  # Simulation speed while Tab is held
+
+# Enemies turn back before leaving this area
+PLAY_AREA = pygame.Rect(20, 20, WIDTH - 40, HEIGHT - 40)
+
+FRAME_THICKNESS = 15
+FRAME_STRIPS = [
+    pygame.Rect(0, 0, WIDTH, FRAME_THICKNESS),
+    pygame.Rect(0, HEIGHT - FRAME_THICKNESS, WIDTH, FRAME_THICKNESS),
+    pygame.Rect(0, 0, FRAME_THICKNESS, HEIGHT),
+    pygame.Rect(WIDTH - FRAME_THICKNESS, 0, FRAME_THICKNESS, HEIGHT),
+]
+
+def carve_maze(cols, rows, seed):
+    # Iterative recursive backtracker. Returns the block grid: (2*rows+1) lists
+    # of (2*cols+1) flags, True where there is wall. Cells sit at odd/odd.
+    rng = random.Random(seed)
+    blocks = [[True] * (2 * cols + 1) for _ in range(2 * rows + 1)]
+    visited = [[False] * cols for _ in range(rows)]
+    stack = [(0, rows - 1)]
+    visited[rows - 1][0] = True
+    blocks[2 * rows - 1][1] = False
+    
+    while stack:
+        col, row = stack[-1]
+        neighbours = [(col + dc, row + dr) for dc, dr in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                      if 0 <= col + dc < cols and 0 <= row + dr < rows
+                      and not visited[row + dr][col + dc]]
+        if not neighbours:
+            stack.pop()
+            continue
+        next_col, next_row = rng.choice(neighbours)
+        visited[next_row][next_col] = True
+        blocks[2 * next_row + 1][2 * next_col + 1] = False
+        blocks[row + next_row + 1][col + next_col + 1] = False
+        stack.append((next_col, next_row))
+    return blocks
+
+def merge_wall_blocks(blocks):
+    # Greedy meshing: maximal horizontal runs per block row, then each run is
+    # grown downward while the rows below hold the same run. Returns
+    # (col, row, width, height) in blocks.
+    height, width = len(blocks), len(blocks[0])
+    used = [[False] * width for _ in range(height)]
+    merged = []
+    for row in range(height):
+        col = 0
+        while col < width:
+            if not blocks[row][col] or used[row][col]:
+                col += 1
+                continue
+            end = col
+            while end + 1 < width and blocks[row][end + 1] and not used[row][end + 1]:
+                end += 1
+            bottom = row
+            while bottom + 1 < height and all(blocks[bottom + 1][c] and not used[bottom + 1][c]
+                                              for c in range(col, end + 1)):
+                bottom += 1
+            for r in range(row, bottom + 1):
+                for c in range(col, end + 1):
+                    used[r][c] = True
+            merged.append((col, row, end - col + 1, bottom - row + 1))
+            col = end + 1
+    return merged
+
+def block_span(start, count):
+    # Even blocks are wall lines (MAZE_WALL px), odd blocks are corridors
+    def edge(index):
+        return (index // 2) * MAZE_CELL + (MAZE_WALL if index % 2 else 0)
+    return edge(start), edge(start + count) - edge(start)
+
+def maze_world_size(cols, rows):
+    return cols * MAZE_CELL + MAZE_WALL, rows * MAZE_CELL + MAZE_WALL
+
+def generate_maze(cols, rows, seed):
+    # Wall rects as (x, y, w, h) tuples, merged into as few rects as possible
+    walls = []
+    for col, row, width, height in merge_wall_blocks(carve_maze(cols, rows, seed)):
+        x, w = block_span(col, width)
+        y, h = block_span(row, height)
+        walls.append((x, y, w, h))
+    return walls
+
+def load_maze(cols, rows, seed):
+    # generate_maze() with an on-disk cache keyed by everything the walls
+    # depend on: the format version, cell geometry, size and seed
+    name = f"maze_v{MAZE_CACHE_VERSION}_{MAZE_CELL}-{MAZE_WALL}_{cols}x{rows}_{seed}.json"
+    path = os.path.join(MAZE_CACHE_DIR, name)
+    try:
+        with open(path) as f:
+            return [tuple(wall) for wall in json.load(f)]
+    except (OSError, ValueError):
+        pass
+    
+    walls = generate_maze(cols, rows, seed)
+    try:
+        os.makedirs(MAZE_CACHE_DIR, exist_ok=True)
+        # Write then rename so a concurrent reader never sees half a file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(walls, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except OSError:
+        pass  # The cache is only an optimisation
+    return walls
+
+def poisson_disk_sample(area, radius, is_valid, rng=random, points=(), attempts=30):
+    # Bridson's algorithm. Returns new integer points inside area (edges
+    # included), at least radius from each other and from the given points,
+    # for which is_valid(x, y) holds. Every point is tried at most `attempts`
+    # times before it retires, so the run time is bounded by the area.
+    # The grid reaches radius beyond area, so given points just outside it
+    # still keep new ones away; points further out are too far to matter
+    cell = radius / math.sqrt(2)
+    left, top = area.left - radius, area.top - radius
+    cols = int((area.width + 2 * radius) / cell) + 1
+    rows = int((area.height + 2 * radius) / cell) + 1
+    grid = [None] * (cols * rows)
+    crowded = []  # Given points that landed in an occupied cell
+    samples = []
+    radius_sq = radius * radius
+    
+    def cell_of(x, y):
+        return int((x - left) // cell), int((y - top) // cell)
+    
+    def fits(x, y):
+        col, row = cell_of(x, y)
+        for r in range(max(row - 2, 0), min(row + 3, rows)):
+            for c in range(max(col - 2, 0), min(col + 3, cols)):
+                index = grid[r * cols + c]
+                if index is not None:
+                    other_x, other_y = samples[index]
+                    if (x - other_x)**2 + (y - other_y)**2 < radius_sq:
+                        return False
+        for index in crowded:
+            other_x, other_y = samples[index]
+            if (x - other_x)**2 + (y - other_y)**2 < radius_sq:
+                return False
+        return True
+    
+    def add(x, y):
+        col, row = cell_of(x, y)
+        if 0 <= col < cols and 0 <= row < rows:
+            if grid[row * cols + col] is None:
+                grid[row * cols + col] = len(samples)
+            else:
+                crowded.append(len(samples))
+        samples.append((x, y))
+    
+    for x, y in points:
+        add(x, y)
+    active = list(range(len(samples)))
+    
+    if not active:
+        for _ in range(attempts):
+            x = rng.randint(area.left, area.right)
+            y = rng.randint(area.top, area.bottom)
+            if is_valid(x, y):
+                add(x, y)
+                active.append(0)
+                break
+    
+    while active:
+        slot = rng.randrange(len(active))
+        origin_x, origin_y = samples[active[slot]]
+        for _ in range(attempts):
+            angle = rng.uniform(0, 2 * math.pi)
+            distance = rng.uniform(radius, 2 * radius)
+            x = int(origin_x + math.cos(angle) * distance)
+            y = int(origin_y + math.sin(angle) * distance)
+            if (area.left <= x <= area.right and area.top <= y <= area.bottom
+                    and fits(x, y) and is_valid(x, y)):
+                active.append(len(samples))
+                add(x, y)
+                break
+        else:
+            active[slot] = active[-1]
+            active.pop()
+    
+    return samples[len(points):]
+
+FIELD_STEP = 10  # px between distance field samples
+
+class DistanceField:
+    # Breadth-first path lengths from one point to everywhere a body of the
+    # given size can stand, sampled every FIELD_STEP px. Diagonal steps count
+    # as one, matching how far the player gets per tick with two keys held.
+    # Built once per level; lookups afterwards are plain list indexing. A Rect
+    # source measures from every spot where the body overlaps it instead.
+    def __init__(self, walls, world, source, body=40, step=FIELD_STEP):
+        self.step = step
+        self.body = body
+        self.cols = world.width // step
+        self.rows = world.height // step
+        cols, rows = self.cols, self.rows
+        half = body // 2
+        
+        # Node (col, row) is the body centred on (col * step + step // 2, ...).
+        # Each wall blocks the block of nodes whose body overlaps it, so the
+        # grid is filled straight from the rects at node resolution. It has a
+        # blocked border one node wide, so the search needs no bounds checks.
+        width = cols + 2
+        left = max(-((step // 2 - half) // step), 0)
+        right = min((world.width - body - step // 2 + half) // step, cols - 1)
+        top = max(-((step // 2 - half) // step), 0)
+        bottom = min((world.height - body - step // 2 + half) // step, rows - 1)
+        walkable = bytearray(width * (rows + 2))
+        for row in range(top + 1, bottom + 2):
+            walkable[row * width + left + 1:row * width + right + 2] = b"\x01" * (right - left + 1)
+        for wall in walls:
+            wall_left, wall_right, wall_top, wall_bottom = self.rect_bounds(pygame.Rect(wall))
+            if wall_left > wall_right:
+                continue
+            for row in range(wall_top + 1, wall_bottom + 2):
+                walkable[row * width + wall_left + 1:row * width + wall_right + 2] = bytes(wall_right - wall_left + 1)
+        
+        if isinstance(source, pygame.Rect):
+            starts = self.rect_nodes(source)
+        else:
+            start_col, start_row = source[0] // step, source[1] // step
+            starts = [(start_row, start_col)] if 0 <= start_col < cols and 0 <= start_row < rows else []
+        starts = [(row + 1) * width + col + 1 for row, col in starts]
+        
+        # Walkable doubles as the unvisited set: nodes are cleared as they are reached
+        found = [-1] * len(walkable)
+        frontier = [start for start in starts if walkable[start]]
+        for start in frontier:
+            walkable[start] = 0
+        neighbours = [dr * width + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+        distance = 0
+        while frontier:
+            reached = []
+            for index in frontier:
+                found[index] = distance
+                for offset in neighbours:
+                    neighbour = index + offset
+                    if walkable[neighbour]:
+                        walkable[neighbour] = 0
+                        reached.append(neighbour)
+            frontier = reached
+            distance += 1
+        
+        distances = []
+        for row in range(1, rows + 1):
+            distances += found[row * width + 1:row * width + cols + 1]
+        self.distances = distances
+    
+    def distance_to(self, x, y):
+        # Path length in px to stand centred on (x, y), or None if unreachable
+        col, row = int(x) // self.step, int(y) // self.step
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            distance = self.distances[row * self.cols + col]
+            if distance >= 0:
+                return distance * self.step
+        return None
+    
+    def rect_bounds(self, rect):
+        # Inclusive (left, right, top, bottom) node range whose body overlaps rect
+        step, offset = self.step, self.body // 2 - self.step // 2
+        left = max((rect.left + offset - self.body) // step + 1, 0)
+        right = min((rect.right + offset - 1) // step, self.cols - 1)
+        top = max((rect.top + offset - self.body) // step + 1, 0)
+        bottom = min((rect.bottom + offset - 1) // step, self.rows - 1)
+        return left, right, top, bottom
+    
+    def rect_nodes(self, rect):
+        left, right, top, bottom = self.rect_bounds(rect)
+        return [(row, col) for row in range(top, bottom + 1) for col in range(left, right + 1)]
+    
+    def distance_to_rect(self, rect):
+        # Path length in px until the body first overlaps rect, or None
+        step = self.step
+        left, right, top, bottom = self.rect_bounds(rect)
+        best = -1
+        for row in range(top, bottom + 1):
+            base = row * self.cols
+            for distance in self.distances[base + left:base + right + 1]:
+                if distance >= 0 and (best < 0 or distance < best):
+                    best = distance
+        return best * step if best >= 0 else None
+
+class SpatialGrid:
+    # Uniform hash over GRID_SIZE cells. Each item is filed under every cell its
+    # rect covers, so a query only tests items that share a cell with it.
+    # Items keep a reference to their own rect; call move() after it changes.
+    def __init__(self, cell_size=GRID_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}  # id(item) -> [order, item, rect, cell bounds]
+        self.next_order = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def cell_bounds(self, rect):
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+    
+    def cell_keys(self, bounds):
+        left, top, right, bottom = bounds
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                yield (col, row)
+    
+    def insert(self, item, rect):
+        bounds = self.cell_bounds(rect)
+        key = id(item)
+        self.entries[key] = [self.next_order, item, rect, bounds]
+        self.next_order += 1
+        for cell in self.cell_keys(bounds):
+            self.cells.setdefault(cell, []).append(key)
+    
+    def remove(self, item):
+        key = id(item)
+        bounds = self.entries.pop(key)[3]
+        for cell in self.cell_keys(bounds):
+            self.cells[cell].remove(key)
+    
+    def move(self, item):
+        # Refiles the item only when it has crossed into a different set of cells
+        entry = self.entries[id(item)]
+        bounds = self.cell_bounds(entry[2])
+        if bounds != entry[3]:
+            key = id(item)
+            for cell in self.cell_keys(entry[3]):
+                self.cells[cell].remove(key)
+            for cell in self.cell_keys(bounds):
+                self.cells.setdefault(cell, []).append(key)
+            entry[3] = bounds
+    
+    def candidates(self, rect):
+        found = set()
+        cells = self.cells
+        for cell in self.cell_keys(self.cell_bounds(rect)):
+            keys = cells.get(cell)
+            if keys:
+                found.update(keys)
+        return found
+    
+    def hits(self, rect):
+        # Items whose rect overlaps rect, in insertion order like a list scan
+        entries = self.entries
+        found = [entries[key] for key in self.candidates(rect)
+                 if rect.colliderect(entries[key][2])]
+        found.sort(key=lambda entry: entry[0])
+        return [entry[1] for entry in found]
+    
+    def collides(self, rect):
+        entries = self.entries
+        for key in self.candidates(rect):
+            if rect.colliderect(entries[key][2]):
+                return True
+        return False
+    
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+
 class Particle:
-    def __init__(self, x, y, color, velocity, lifetime):
+    __slots__ = ("x", "y", "color", "velocity", "lifetime", "max_lifetime", "size")
+    
+    def __init__(self, x, y, color, velocity, lifetime, size):
         self.x = x
         self.y = y
         self.color = color
         self.velocity = velocity
         self.lifetime = lifetime
         self.max_lifetime = lifetime
-        self.size = random.randint(2, 4)
+        self.size = size
     
     def update(self):
         self.x += self.velocity[0]
         self.y += self.velocity[1]
         self.lifetime -= 1
         
-    def draw(self, screen):
+    def draw(self, screen, offset=(0, 0)):
         if self.lifetime > 0:
             alpha = int(255 * (self.lifetime / self.max_lifetime))
             color_with_alpha = (*self.color[:3], alpha)
             s = pygame.Surface((self.size * 2, self.size * 2))
             s.set_alpha(alpha)
             s.fill(self.color)
-            screen.blit(s, (int(self.x), int(self.y)))
+            screen.blit(s, (int(self.x) + offset[0], int(self.y) + offset[1]))
+
+class ParticleList:
+    # Per-object particle system, used when NumPy is not installed
+    victory_burst = 15
+    
+    def __init__(self, seed=None):
+        self.particles = []
+        self.rng = random.Random(seed)
+    
+    def __len__(self):
+        return len(self.particles)
+    
+    def spawn(self, x, y, color, count, spread=3):
+        rng = self.rng
+        for _ in range(count):
+            velocity = (rng.randint(-spread, spread), rng.randint(-spread, spread))
+            lifetime = rng.randint(15, 30)
+            self.particles.append(Particle(x, y, color, velocity, lifetime, rng.randint(2, 4)))
+    
+    def update(self):
+        self.particles = [p for p in self.particles if p.lifetime > 0]
+        for particle in self.particles:
+            particle.update()
+    
+    def draw(self, screen, offset=(0, 0), view=None):
+        for particle in self.particles:
+            particle.draw(screen, offset)
+    
+    def bounds(self):
+        rects = [pygame.Rect(int(p.x), int(p.y), p.size * 2, p.size * 2)
+                 for p in self.particles if p.lifetime > 0]
+        return rects[0].unionall(rects[1:]) if rects else None
+    
+    def clear(self):
+        self.particles.clear()
+    
+    def reseed(self, seed):
+        self.particles.clear()
+        self.rng = random.Random(seed)
+
+class ParticlePool:
+    # Fixed-capacity structure-of-arrays particle system. Live particles are
+    # kept packed at the front of the arrays, and sprites are cached per
+    # colour, size and alpha so drawing is a single blits() call. Each blit
+    # costs about 1 us, so capacity keeps a full pool inside a frame.
+    victory_burst = 1500
+    max_colors = 16
+    
+    def __init__(self, capacity=10000, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.lifetime = np.zeros(capacity, dtype=np.int32)
+        self.max_lifetime = np.ones(capacity, dtype=np.int32)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.int32)
+        
+        self.colors = []
+        self.sprites = np.empty(self.max_colors * 3 * 256, dtype=object)
+        self.rng = np.random.default_rng(seed)
+    
+    def __len__(self):
+        return self.count
+    
+    def color_index(self, color):
+        if color not in self.colors:
+            if len(self.colors) == self.max_colors:
+                return 0
+            self.colors.append(color)
+        return self.colors.index(color)
+    
+    def spawn(self, x, y, color, count, spread=3):
+        # Bursts beyond capacity are dropped rather than growing the arrays
+        count = min(count, self.capacity - self.count)
+        if count <= 0:
+            return
+        start, end = self.count, self.count + count
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = self.rng.uniform(-spread, spread, count)
+        self.vy[start:end] = self.rng.uniform(-spread, spread, count)
+        lifetime = self.rng.integers(15, 31, count)
+        self.lifetime[start:end] = lifetime
+        self.max_lifetime[start:end] = lifetime
+        self.size[start:end] = self.rng.integers(2, 5, count)
+        self.color[start:end] = self.color_index(color)
+        self.count = end
+    
+    def update(self):
+        n = self.count
+        alive = self.lifetime[:n] > 0
+        live = int(alive.sum())
+        if live < n:
+            for column in (self.x, self.y, self.vx, self.vy, self.lifetime,
+                           self.max_lifetime, self.size, self.color):
+                column[:live] = column[:n][alive]
+            self.count = n = live
+        
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.lifetime[:n] -= 1
+    
+    def sprite(self, key):
+        color_index, rest = divmod(key, 3 * 256)
+        size = rest // 256 + 2
+        alpha = rest % 256
+        s = pygame.Surface((size * 2, size * 2))
+        s.set_alpha(alpha)
+        s.fill(self.colors[color_index])
+        return s
+    
+    def draw(self, screen, offset=(0, 0), view=None):
+        n = self.count
+        shown = self.lifetime[:n] > 0
+        if view is not None:
+            shown &= ((self.x[:n] < view.right) & (self.x[:n] + self.size[:n] * 2 > view.left) &
+                      (self.y[:n] < view.bottom) & (self.y[:n] + self.size[:n] * 2 > view.top))
+        visible = np.flatnonzero(shown)
+        if len(visible) == 0:
+            return
+        
+        lifetime = self.lifetime[visible]
+        alpha = (255 * lifetime / self.max_lifetime[visible]).astype(np.int32)
+        keys = (self.color[visible] * 3 + self.size[visible] - 2) * 256 + alpha
+        
+        sprites = self.sprites[keys]
+        missing = np.flatnonzero(sprites == None)
+        if len(missing):
+            for key in np.unique(keys[missing]).tolist():
+                self.sprites[key] = self.sprite(key)
+            sprites = self.sprites[keys]
+        
+        # Zipped rather than a list of [x, y] lists: zip reuses its tuples, so
+        # a full pool does not hand the garbage collector 10k new objects
+        positions = zip((self.x[visible].astype(np.int32) + offset[0]).tolist(),
+                        (self.y[visible].astype(np.int32) + offset[1]).tolist())
+        screen.blits(zip(sprites, positions), doreturn=False)
+    
+    def bounds(self):
+        n = self.count
+        visible = self.lifetime[:n] > 0
+        if not visible.any():
+            return None
+        x = self.x[:n][visible].astype(np.int32)
+        y = self.y[:n][visible].astype(np.int32)
+        right = x + self.size[:n][visible] * 2
+        bottom = y + self.size[:n][visible] * 2
+        left, top = int(x.min()), int(y.min())
+        return pygame.Rect(left, top, int(right.max()) - left, int(bottom.max()) - top)
+    
+    def clear(self):
+        self.count = 0
+    
+    def reseed(self, seed):
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+class SpriteCache:
+    # Bordered squares rendered once per size and colour, instead of two
+    # pygame.draw.rect calls per entity per frame
+    def __init__(self):
+        self.surfaces = {}
+    
+    def bordered(self, width, height, color, border_color, border):
+        key = (width, height, color, border_color, border)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = pygame.Surface((width + border * 2, height + border * 2))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            surface.fill(border_color)
+            surface.fill(color, (border, border, width, height))
+            self.surfaces[key] = surface
+        return surface
+    
+    def shade(self, width, height, color, alpha):
+        # Translucent fill, e.g. the full-screen fades; one surface per size
+        # and colour whose alpha is set on each use
+        key = (width, height, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = pygame.Surface((width, height))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            surface.fill(color)
+            self.surfaces[key] = surface
+        surface.set_alpha(alpha)
+        return surface
+
+SPRITES = SpriteCache()
+
+def sweep_axis(rect, distance, horizontal, walls, bounds=None):
+    # Moves rect along one axis, stopping it against the first wall in the
+    # way (or the edge of bounds). The whole path is checked, not just where
+    # it ends up, so no distance is large enough to skip through a wall.
+    # Returns True if the move was cut short.
+    if not distance:
+        return False
+    if horizontal:
+        start, size, near, far = rect.x, rect.width, rect.left, rect.right
+        swept = pygame.Rect(min(start, start + distance), rect.y, size + abs(distance), rect.height)
+    else:
+        start, size, near, far = rect.y, rect.height, rect.top, rect.bottom
+        swept = pygame.Rect(rect.x, min(start, start + distance), rect.width, size + abs(distance))
+    target = start + distance
+    
+    for wall in walls.hits(swept):
+        wall_near, wall_far = (wall.left, wall.right) if horizontal else (wall.top, wall.bottom)
+        # Walls already overlapping rect are ignored, so it can always get out
+        if distance > 0 and wall_near >= far:
+            target = min(target, wall_near - size)
+        elif distance < 0 and wall_far <= near:
+            target = max(target, wall_far)
+    
+    if bounds is not None:
+        low, high = (bounds.left, bounds.right) if horizontal else (bounds.top, bounds.bottom)
+        target = max(low, min(target, high - size)) if distance > 0 else min(high - size, max(target, low))
+    
+    if horizontal:
+        rect.x = target
+    else:
+        rect.y = target
+    return target != start + distance
+
+def sweep(rect, dx, dy, walls, bounds=None):
+    # x leg then y leg, each stopped at its time of impact, so a body moving
+    # diagonally into a wall slides along it. Returns (blocked_x, blocked_y).
+    # Both legs lie inside the box around start and end, so when no wall
+    # touches that box only the bounds can stop either of them.
+    box = pygame.Rect(min(rect.x, rect.x + dx), min(rect.y, rect.y + dy),
+                      rect.width + abs(dx), rect.height + abs(dy))
+    if not walls.collides(box):
+        x, y = rect.x + dx, rect.y + dy
+        if bounds is None or bounds.contains(box):
+            rect.topleft = x, y
+            return False, False
+        rect.x = max(bounds.left, min(x, bounds.right - rect.width))
+        rect.y = max(bounds.top, min(y, bounds.bottom - rect.height))
+        return rect.x != x, rect.y != y
+    return (sweep_axis(rect, dx, True, walls, bounds),
+            sweep_axis(rect, dy, False, walls, bounds))
 
 class Player:
+    # Entities use __slots__, and colours every instance shares live on the
+    # class; large enemy and token counts then cost a rect and a few fields
+    # each rather than a dict apiece
+    __slots__ = ("start", "rect", "speed")
+    color = CRIMSON
+    border_color = DARK_OAK
+    
     def __init__(self):
-        self.rect = pygame.Rect(55, HEIGHT - 95, 40, 40)  # Adjusted for frame
+        self.start = (55, HEIGHT - 95)  # Adjusted for frame
+        self.rect = pygame.Rect(*self.start, 40, 40)
         self.speed = 4
-        self.color = CRIMSON
-        self.border_color = DARK_OAK
     
     def move(self, keys, walls):
         dx = 0
@@ -79,153 +720,530 @@ class Player:
         if keys[pygame.K_DOWN] or keys[pygame.K_s]:
             dy = self.speed
         
-        self.rect.x += dx
-        for wall in walls:
-            if self.rect.colliderect(wall):
-                if dx > 0:
-                    self.rect.right = wall.left
-                if dx < 0:
-                    self.rect.left = wall.right
-        
-        self.rect.y += dy
-        for wall in walls:
-            if self.rect.colliderect(wall):
-                if dy > 0:
-                    self.rect.bottom = wall.top
-                if dy < 0:
-                    self.rect.top = wall.bottom
+        sweep(self.rect, dx, dy, walls)
     
-    def draw(self, screen):
-      
-        border_rect = pygame.Rect(self.rect.x - 2, self.rect.y - 2, 
-                                 self.rect.width + 4, self.rect.height + 4)
-        pygame.draw.rect(screen, self.border_color, border_rect)
-        pygame.draw.rect(screen, self.color, self.rect)
+    def blit_args(self, offset=(0, 0)):
+        # (surface, position) as Surface.blits() takes them
+        rect = self.rect
+        sprite = SPRITES.bordered(rect.width, rect.height, self.color, self.border_color, 2)
+        return sprite, (rect.x + offset[0] - 2, rect.y + offset[1] - 2)
+    
+    def draw(self, screen, offset=(0, 0)):
+        screen.blit(*self.blit_args(offset))
     
     def reset_position(self):
-        self.rect.topleft = (55, HEIGHT - 95)  # Adjusted for frame
+        self.rect.topleft = self.start
 
 class Enemy:
+    __slots__ = ("rect", "color")
+    border_color = DARK_OAK
+    
     def __init__(self, x, y, size, color):
         self.rect = pygame.Rect(x, y, size, size)
         self.color = color
-        self.border_color = DARK_OAK
     
-    def draw(self, screen):
-      
-        border_rect = pygame.Rect(self.rect.x - 1, self.rect.y - 1, 
-                                 self.rect.width + 2, self.rect.height + 2)
-        pygame.draw.rect(screen, self.border_color, border_rect)
-        pygame.draw.rect(screen, self.color, self.rect)
+    def blit_args(self, offset=(0, 0)):
+        rect = self.rect
+        sprite = SPRITES.bordered(rect.width, rect.height, self.color, self.border_color, 1)
+        return sprite, (rect.x + offset[0] - 1, rect.y + offset[1] - 1)
+    
+    def draw(self, screen, offset=(0, 0)):
+        screen.blit(*self.blit_args(offset))
 
 class WanderingEnemy(Enemy):
-    def __init__(self, x, y):
+    __slots__ = ("rng", "direction_x", "direction_y", "move_timer", "speed_boost", "aggressiveness")
+    
+    def __init__(self, x, y, rng=random):
         super().__init__(x, y, 35, RED)
-        self.direction_x = random.choice([-2, -1, 1, 2])
-        self.direction_y = random.choice([-2, -1, 1, 2])
+        self.rng = rng
+        self.direction_x = rng.choice([-2, -1, 1, 2])
+        self.direction_y = rng.choice([-2, -1, 1, 2])
         self.move_timer = 0
-        self.speed_boost = random.choice([1.0, 1.2, 1.5])  # Some enemies are faster
-        self.aggressiveness = random.choice([0.7, 1.0, 1.3])  # Some change direction more
+        self.speed_boost = rng.choice([1.0, 1.2, 1.5])  # Some enemies are faster
+        self.aggressiveness = rng.choice([0.7, 1.0, 1.3])  # Some change direction more
+    
+    @classmethod
+    def from_state(cls, x, y, size, rng, direction_x, direction_y, move_timer, speed_boost, aggressiveness):
+        # Rebuilds a saved enemy without drawing from rng
+        enemy = cls.__new__(cls)
+        Enemy.__init__(enemy, x, y, size, RED)
+        enemy.rng = rng
+        enemy.direction_x = direction_x
+        enemy.direction_y = direction_y
+        enemy.move_timer = move_timer
+        enemy.speed_boost = speed_boost
+        enemy.aggressiveness = aggressiveness
+        return enemy
     
-    def update(self, walls):
+    def update(self, walls, bounds=None):
       
         self.move_timer += 1
         direction_change_chance = int(120 / self.aggressiveness)
         
-        if self.move_timer > random.randint(80, direction_change_chance):
-            self.direction_x = random.choice([-2, -1, 1, 2])
-            self.direction_y = random.choice([-2, -1, 1, 2])
+        # The threshold is drawn from [80, chance], so there is nothing to roll
+        # until the timer passes 80
+        if self.move_timer > 80 and self.move_timer > self.rng.randint(80, direction_change_chance):
+            self.direction_x = self.rng.choice([-2, -1, 1, 2])
+            self.direction_y = self.rng.choice([-2, -1, 1, 2])
             self.move_timer = 0
         
-        old_x = self.rect.x
-        old_y = self.rect.y
-        
-      
         move_x = int(self.direction_x * self.speed_boost)
         move_y = int(self.direction_y * self.speed_boost)
         
-        self.rect.x += move_x
-        self.rect.y += move_y
-        
-        hit_wall = False
-        for wall in walls:
-            if self.rect.colliderect(wall):
-                hit_wall = True
-                break
-        
-        if hit_wall or self.rect.left < 20 or self.rect.right > WIDTH - 20 or self.rect.top < 20 or self.rect.bottom > HEIGHT - 20:
-            self.rect.x = old_x
-            self.rect.y = old_y
+        # Stops at the wall and bounces off it on the axis that hit
+        if bounds is None:
+            bounds = PLAY_AREA
+        blocked_x, blocked_y = sweep(self.rect, move_x, move_y, walls, bounds)
+        if blocked_x:
             self.direction_x = -self.direction_x
+        if blocked_y:
             self.direction_y = -self.direction_y
 
+WALL_MAP_CELL = 10  # px per WallMap square
+
+class WallMap:
+    # Summed-area table of which cell x cell squares hold any wall, so "might
+    # this rect touch a wall" is four array lookups and can be asked for many
+    # rects at once. Conservative: a rect sharing a square with a wall counts.
+    def __init__(self, walls, width=WIDTH, height=HEIGHT, cell=WALL_MAP_CELL):
+        self.cell = cell
+        self.cols = -(-width // cell)
+        self.rows = -(-height // cell)
+        occupied = np.zeros((self.rows, self.cols), dtype=np.uint8)
+        for wall in walls:
+            clipped = wall.clip(0, 0, width, height)
+            if clipped.width and clipped.height:
+                occupied[clipped.top // cell:-(-clipped.bottom // cell),
+                         clipped.left // cell:-(-clipped.right // cell)] = 1
+        self.table = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+        self.table[1:, 1:] = occupied.cumsum(0, dtype=np.int32).cumsum(1, dtype=np.int32)
+    
+    def overlaps(self, x, y, w, h):
+        cell = self.cell
+        x0 = np.clip(x // cell, 0, self.cols)
+        x1 = np.clip(-(-(x + w) // cell), 0, self.cols)
+        y0 = np.clip(y // cell, 0, self.rows)
+        y1 = np.clip(-(-(y + h) // cell), 0, self.rows)
+        table = self.table
+        return (table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]) > 0
+
+class EnemyHorde:
+    # Array-backed alternative to updating WanderingEnemy objects one by one.
+    # Direction rolls consume rng in the same order as the per-object path,
+    # so a seeded game plays out identically on either backend.
+    def __init__(self, enemies, walls, world=None, bounds=None, rng=random):
+        world = world or pygame.Rect(0, 0, WIDTH, HEIGHT)
+        self.bounds = bounds or PLAY_AREA
+        self.enemies = enemies
+        self.rng = rng
+        self.wall_map = WallMap(walls, world.width, world.height)
+        self.wall_grid = SpatialGrid()
+        for wall in walls:
+            self.wall_grid.insert(wall, wall)
+        self.x = np.array([e.rect.x for e in enemies], dtype=np.int64)
+        self.y = np.array([e.rect.y for e in enemies], dtype=np.int64)
+        self.w = np.array([e.rect.width for e in enemies], dtype=np.int64)
+        self.h = np.array([e.rect.height for e in enemies], dtype=np.int64)
+        self.direction_x = np.array([e.direction_x for e in enemies], dtype=np.int64)
+        self.direction_y = np.array([e.direction_y for e in enemies], dtype=np.int64)
+        self.speed_boost = np.array([e.speed_boost for e in enemies])
+        self.aggressiveness = np.array([e.aggressiveness for e in enemies])
+        self.move_timer = np.array([e.move_timer for e in enemies], dtype=np.int64)
+        self.direction_change_chance = [int(120 / a) for a in self.aggressiveness.tolist()]
+    
+    def __len__(self):
+        return len(self.enemies)
+    
+    def update(self):
+        self.move_timer += 1
+        
+        for i in np.flatnonzero(self.move_timer > 80).tolist():
+            if self.move_timer[i] > self.rng.randint(80, self.direction_change_chance[i]):
+                self.direction_x[i] = self.rng.choice([-2, -1, 1, 2])
+                self.direction_y[i] = self.rng.choice([-2, -1, 1, 2])
+                self.move_timer[i] = 0
+        
+        # astype truncates toward zero, like int()
+        move_x = (self.direction_x * self.speed_boost).astype(np.int64)
+        move_y = (self.direction_y * self.speed_boost).astype(np.int64)
+        
+        # Enemies with no wall in the box around their whole move only need
+        # clamping to the bounds, which stops each axis at its own edge; the
+        # few that might hit a wall go through sweep() one at a time
+        maybe = self.wall_map.overlaps(np.minimum(self.x, self.x + move_x),
+                                       np.minimum(self.y, self.y + move_y),
+                                       self.w + np.abs(move_x), self.h + np.abs(move_y))
+        free = ~maybe
+        bounds = self.bounds
+        for position, move, direction, low, high in (
+                (self.x, move_x, self.direction_x, bounds.left, bounds.right - self.w),
+                (self.y, move_y, self.direction_y, bounds.top, bounds.bottom - self.h)):
+            target = position + move
+            clamped = np.clip(target, low, high)
+            position[free] = clamped[free]
+            direction[free & (clamped != target)] *= -1
+        
+        rect = pygame.Rect(0, 0, 0, 0)
+        for i in np.flatnonzero(maybe).tolist():
+            rect.update(int(self.x[i]), int(self.y[i]), int(self.w[i]), int(self.h[i]))
+            blocked_x, blocked_y = sweep(rect, int(move_x[i]), int(move_y[i]), self.wall_grid, bounds)
+            self.x[i] = rect.x
+            self.y[i] = rect.y
+            if blocked_x:
+                self.direction_x[i] *= -1
+            if blocked_y:
+                self.direction_y[i] *= -1
+    
+    def collides(self, rect):
+        return bool(np.any((self.x < rect.right) & (self.x + self.w > rect.left) &
+                           (self.y < rect.bottom) & (self.y + self.h > rect.top)))
+    
+    def visible(self, rect):
+        # Enemies overlapping rect, synced so they can be drawn
+        inside = np.flatnonzero((self.x < rect.right) & (self.x + self.w > rect.left) &
+                                (self.y < rect.bottom) & (self.y + self.h > rect.top))
+        self.sync(inside)
+        return [self.enemies[i] for i in inside.tolist()]
+    
+    def sync(self, indices=None):
+        # Copies array state back onto the enemy objects, e.g. before drawing
+        if indices is None:
+            indices = np.arange(len(self.enemies))
+        for i, x, y, dx, dy, timer in zip(indices.tolist(), self.x[indices].tolist(), self.y[indices].tolist(),
+                                          self.direction_x[indices].tolist(), self.direction_y[indices].tolist(),
+                                          self.move_timer[indices].tolist()):
+            enemy = self.enemies[i]
+            enemy.rect.x = x
+            enemy.rect.y = y
+            enemy.direction_x = dx
+            enemy.direction_y = dy
+            enemy.move_timer = timer
+
+# How far a token grows on each tick of its 60 tick pulse: 2 * |cos(3t deg)|
+TOKEN_PULSE = [int(2 * abs(math.cos(math.radians(tick * 3)))) for tick in range(60)]
+
 class Token:
-    def __init__(self, x, y):
+    __slots__ = ("rect", "pulse_timer")
+    color = YELLOW
+    border_color = DARK_OAK
+    
+    def __init__(self, x, y, rng=random):
         self.rect = pygame.Rect(x, y, 20, 20)
-        self.color = YELLOW
-        self.border_color = DARK_OAK
-        self.pulse_timer = random.randint(0, 60)  # Random start for animation variety
+        self.pulse_timer = rng.randint(0, 60)  # Random start for animation variety
+    
+    @classmethod
+    def from_state(cls, x, y, pulse_timer):
+        token = cls.__new__(cls)
+        token.rect = pygame.Rect(x, y, 20, 20)
+        token.pulse_timer = pulse_timer
+        return token
     
     def update(self):
         self.pulse_timer += 1
     
-    def draw(self, screen):
+    def blit_args(self, offset=(0, 0)):
+        size_mod = TOKEN_PULSE[self.pulse_timer % 60]
+        rect = self.rect
+        sprite = SPRITES.bordered(rect.width + size_mod * 2, rect.height + size_mod * 2,
+                                  self.color, self.border_color, 1)
+        return sprite, (rect.x + offset[0] - 1 - size_mod, rect.y + offset[1] - 1 - size_mod)
+    
+    def draw(self, screen, offset=(0, 0)):
+        screen.blit(*self.blit_args(offset))
+
+class Camera:
+    # Which part of the world is on screen. Everything in the world is drawn
+    # at world position + offset, which folds in both scrolling and shake.
+    def __init__(self, world, width=WIDTH, height=HEIGHT):
+        self.world = world
+        self.view = pygame.Rect(0, 0, width, height)
+        self.shake = (0, 0)
+    
+    def follow(self, rect):
+        view = self.view
+        view.center = rect.center
+        # Never past the world's top-left; worlds smaller than the screen stay
+        # pinned there
+        view.x = max(0, min(view.x, self.world.width - view.width))
+        view.y = max(0, min(view.y, self.world.height - view.height))
+    
+    @property
+    def offset(self):
+        return (self.shake[0] - self.view.x, self.shake[1] - self.view.y)
+    
+    def cull_rect(self):
+        # The view plus room for the largest shake (15px) and entity borders
+        return self.view.inflate(40, 40)
+
+class BackgroundTiles:
+    # The static layer (floor, walls, goal) rendered lazily in square tiles.
+    # Only tiles the camera has shown are ever drawn, and at most max_tiles
+    # are kept, so huge mazes cost memory and time only for what is seen.
+    def __init__(self, game, tile_size=512, max_tiles=48):
+        self.walls = game.wall_grid
+        self.goal = game.goal
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()
+    
+    def tile(self, col, row):
+        key = (col, row)
+        surface = self.tiles.get(key)
+        if surface is not None:
+            self.tiles.move_to_end(key)
+            return surface
         
-        pulse = abs(pygame.math.Vector2(0, 1).rotate(self.pulse_timer * 3).y)
-        size_mod = int(2 * pulse)
+        size = self.tile_size
+        area = pygame.Rect(col * size, row * size, size, size)
+        surface = pygame.Surface(area.size)
+        surface.fill(OAK_BROWN)
         
-        border_rect = pygame.Rect(self.rect.x - 1 - size_mod, self.rect.y - 1 - size_mod, 
-                                 self.rect.width + 2 + size_mod * 2, self.rect.height + 2 + size_mod * 2)
-        token_rect = pygame.Rect(self.rect.x - size_mod, self.rect.y - size_mod,
-                               self.rect.width + size_mod * 2, self.rect.height + size_mod * 2)
+        # Draw walls with subtle depth effect. All shadows go down first so
+        # walls that touch (merged maze walls, the cross) join without seams.
+        walls = self.walls.hits(area.move(-2, -2).union(area))
+        origin = (-area.x, -area.y)
+        for wall in walls:
+            pygame.draw.rect(surface, DARK_OAK, wall.move(2, 2).move(origin))
+        for wall in walls:
+            pygame.draw.rect(surface, WHITE, wall.move(origin))
+        
+        goal = self.goal.move(origin)
+        pygame.draw.rect(surface, DARK_OAK, goal.inflate(6, 6))
+        pygame.draw.rect(surface, GREEN, goal)
+        
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        self.tiles[key] = surface
+        if len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return surface
+    
+    def blit(self, screen, area, dest):
+        # Copies the world rect `area` to screen position dest
+        size = self.tile_size
+        for row in range(max(area.top, 0) // size, (area.bottom - 1) // size + 1):
+            for col in range(max(area.left, 0) // size, (area.right - 1) // size + 1):
+                tile_area = pygame.Rect(col * size, row * size, size, size)
+                part = area.clip(tile_area)
+                screen.blit(self.tile(col, row),
+                            (dest[0] + part.x - area.x, dest[1] + part.y - area.y),
+                            part.move(-tile_area.x, -tile_area.y))
+
+class KeyState:
+    # Stand-in for pygame.key.get_pressed() when driving the game without a window
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+    
+    def __getitem__(self, key):
+        return key in self.pressed
+
+NO_KEYS = KeyState()
+
+class TextCache:
+    # LRU cache of rendered text surfaces; HUD and overlay strings rarely change
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+    
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
         
-        pygame.draw.rect(screen, self.border_color, border_rect)
-        pygame.draw.rect(screen, self.color, token_rect)
+        surface = font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+    
+    def clear(self):
+        self.surfaces.clear()
+
+# Game.save_state() layout: header, the game's Random, the level's Random
+# when it is a separate one, then one record per enemy and per token
+STATE_VERSION = 1
+STATE_HEADER = struct.Struct("<BHHHBIHBIBBiiHHHI")  # version, maze cols/rows, level, layout, maze seed,
+                                                    # tokens collected, flags, fade, shake, dorm, player x/y,
+                                                    # enemy count, token count, pending level and seed
+RNG_STATE = struct.Struct("<625Id")  # Mersenne Twister words and position, gauss_next (NaN for None)
+ENEMY_STATE = struct.Struct("<iiHbbHdd")  # x, y, size, direction x/y, move timer, speed boost, aggressiveness
+TOKEN_STATE = struct.Struct("<iiI")  # x, y, pulse timer
+STATE_GAME_OVER, STATE_WON, STATE_SHARED_LEVEL_RNG, STATE_PENDING_LEVEL = 1, 2, 4, 8
+LAYOUT_CACHE_SIZE = 4
+SAVE_MAGIC = b"DDSV"
+SAVE_PATH = "dormdash_save.bin"
+
+def pack_rng(rng):
+    _, words, gauss_next = rng.getstate()
+    return RNG_STATE.pack(*words, math.nan if gauss_next is None else gauss_next)
+
+def unpack_rng(data, offset=0):
+    *words, gauss_next = RNG_STATE.unpack_from(data, offset)
+    return (3, tuple(words), None if math.isnan(gauss_next) else gauss_next)
+
+class AssetManager:
+    # Fonts are resolved to files once and the paths kept in FONT_CACHE_PATH,
+    # so later runs skip pygame's system font scan. Only fonts that were found
+    # are kept, so one installed later is picked up. Images load on a worker
+    # thread the first time they are asked for; image() returns None until
+    # the surface is ready, or for good if it failed to load.
+    def __init__(self, cache_path=FONT_CACHE_PATH):
+        if not pygame.font.get_init():
+            pygame.font.init()
+        self.cache_path = cache_path
+        try:
+            with open(cache_path) as f:
+                # Misses cached by older versions are looked up again
+                self.font_paths = {key: path for key, path in json.load(f).items() if path is not None}
+        except (OSError, ValueError):
+            self.font_paths = {}
+        self.images = {}
+    
+    def font_path(self, name, bold=False):
+        key = f"{name}:{'bold' if bold else 'regular'}"
+        if key not in self.font_paths:
+            self.font_paths[key] = pygame.font.match_font(name, bold=bold) if name else None
+            if self.font_paths[key] is not None:
+                self.save_font_paths()
+        return self.font_paths[key]
+    
+    def save_font_paths(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump({key: path for key, path in self.font_paths.items() if path is not None}, f, indent=1)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            pass  # Fonts just get resolved again next run
+    
+    def font(self, name, size, bold=False):
+        path = self.font_path(name, bold)
+        try:
+            font = pygame.font.Font(path, size)
+        except (OSError, pygame.error):
+            # The cached file went away; fall back to pygame's own font
+            self.font_paths.pop(f"{name}:{'bold' if bold else 'regular'}", None)
+            path = None
+            font = pygame.font.Font(None, size)
+        if bold and path is None:
+            font.set_bold(True)
+        return font
+    
+    def image(self, path, size=None, alpha=False):
+        key = (path, size, alpha)
+        if key not in self.images:
+            self.images[key] = None
+            threading.Thread(target=self.load_image, args=key, daemon=True).start()
+        return self.images[key]
+    
+    def load_image(self, path, size, alpha):
+        try:
+            surface = pygame.image.load(path)
+        except (OSError, pygame.error):
+            return
+        if size:
+            surface = pygame.transform.scale(surface, size)
+        # Match the display's pixel format once, rather than on every blit
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha() if alpha else surface.convert()
+        self.images[path, size, alpha] = surface
 
 class Game:
-    def __init__(self):
+    # Class attributes so they can be read without building a level
+    max_level = 10  # Cap at level 10 (10 enemies, 7 tokens)
+    base_enemies = 3
+    base_tokens = 3
+    max_enemies = 10
+    max_tokens = 7
+    
+    def __init__(self, headless=False, enemy_backend="objects", maze_size=None, seed=None, prefetch=False, level=1):
+        self.headless = headless
+        # Build the next level on a worker thread during the game over screen;
+        # only worth it where a player will press R, i.e. main()
+        self.prefetch = prefetch
+        # Everything that shapes play draws from self.rng, so a seed plus the
+        # keys held each tick replays a session exactly. Cosmetic randomness
+        # (particles, screen shake) has generators of its own, seeded from the
+        # same seed so frames repeat too, but never touching self.rng.
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.effects_rng = random.Random(f"{self.seed} effects")
+        self.profiler = None  # A FrameProfiler while per-phase timing is on
+        # (cols, rows) switches from the two hand-placed layouts to generated
+        # mazes of that many cells, which may be larger than the screen
+        self.maze_size = maze_size
+        if maze_size:
+            self.world = pygame.Rect(0, 0, *maze_world_size(*maze_size))
+        else:
+            self.world = pygame.Rect(0, 0, WIDTH, HEIGHT)
+        self.play_area = self.world.inflate(-40, -40)
+        self.camera = Camera(self.world)
+        # "array" steps all wandering enemies together through EnemyHorde
+        if enemy_backend == "array" and np is None:
+            raise RuntimeError("The array enemy backend requires NumPy")
+        self.enemy_backend = enemy_backend
+        self.horde = None
+        # (level, seed, builder, thread) for the level R will start, made
+        # while the game over screen shows
+        self.pending_level = None
+        # Recently played layouts by (current_maze, maze_seed), so rewinding
+        # across a restart does not rebuild their distance fields
+        self.layouts = OrderedDict()
         self.player = Player()
         self.enemies = []
         self.tokens = []
         self.walls = []
-        self.particles = []  # Particle system for effects
+        # Spatial indexes over the lists above, rebuilt by setup_game()
+        self.wall_grid = SpatialGrid()
+        self.enemy_grid = SpatialGrid()
+        self.token_grid = SpatialGrid()
+        self.particles = ParticlePool(seed=self.seed) if np is not None else ParticleList(self.seed)  # Particle system for effects
         self.goal = pygame.Rect(WIDTH - 115, 55, 60, 60)  # Adjusted for frame
+        if maze_size:
+            cols, rows = maze_size
+            # Start in the bottom-left cell, goal in the top-right one
+            corridor = MAZE_CELL - MAZE_WALL
+            self.player.start = (MAZE_WALL + (corridor - 40) // 2,
+                                 (rows - 1) * MAZE_CELL + MAZE_WALL + (corridor - 40) // 2)
+            self.player.reset_position()
+            self.goal.topleft = ((cols - 1) * MAZE_CELL + MAZE_WALL + (corridor - 60) // 2,
+                                 MAZE_WALL + (corridor - 60) // 2)
         self.tokens_collected = 0
         self.game_over = False
         self.won = False
-        self.selected_dorm = random.choice(EXETER_DORMS)
+        self.selected_dorm = self.rng.choice(EXETER_DORMS)
         self.fade_timer = 0
         self.fade_duration = 60
         self.screen_shake = 0  # Screen shake effect
         
        
-        self.level = 1
-        self.max_level = 10  # Cap at level 10 (10 enemies, 7 tokens)
-        self.base_enemies = 3
-        self.base_tokens = 3
-        self.max_enemies = 10
-        self.max_tokens = 7
-        
-    
-        try:
-            self.title_font = pygame.font.SysFont("Georgia", 42, bold=True)
-            self.font = pygame.font.SysFont("Georgia", 28)
-            self.small_font = pygame.font.SysFont("Georgia", 20)
-        except:
-            self.title_font = pygame.font.SysFont(None, 42)
-            self.font = pygame.font.SysFont(None, 28)
-            self.small_font = pygame.font.SysFont(None, 20)
+        self.level = level
         
-   
-        self.exeter_seal = None
-        try:
-            self.exeter_seal = pygame.image.load("/mnt/user-data/uploads/Screenshot_2025-11-17_at_8_08_42_PM.png")
-            self.exeter_seal = pygame.transform.scale(self.exeter_seal, (120, 120))
-        except:
-            pass
+        # Headless games never draw, so skip the font scan and image load
+        self.title_font = self.font = self.small_font = None
+        self.assets = None
+        self.text_cache = TextCache()
+        if not headless:
+            self.load_assets()
         
         self.setup_game()
     
+    def load_assets(self):
+        self.assets = AssetManager()
+        self.title_font = self.assets.font("Georgia", 42, bold=True)
+        self.font = self.assets.font("Georgia", 28)
+        self.small_font = self.assets.font("Georgia", 20)
+    
+    @property
+    def exeter_seal(self):
+        # Only shown on the victory screen, so it starts loading from there
+        if self.assets is None:
+            return None
+        return self.assets.image(SEAL_IMAGE, (120, 120))
+    
     def get_current_enemy_count(self):
       
         return min(self.base_enemies + (self.level - 1), self.max_enemies)
@@ -242,10 +1260,7 @@ class Game:
     
     def add_particles(self, x, y, color, count=5):
        
-        for _ in range(count):
-            velocity = (random.randint(-3, 3), random.randint(-3, 3))
-            lifetime = random.randint(15, 30)
-            self.particles.append(Particle(x, y, color, velocity, lifetime))
+        self.particles.spawn(x, y, color, count)
     
     def trigger_screen_shake(self, intensity=10):
     
@@ -253,17 +1268,29 @@ class Game:
     
     def get_grid_sectors(self):
         sectors = []
-        for row in range(2, GRID_ROWS - 1):  
-            for col in range(1, GRID_COLS - 2): 
-                x = col * GRID_SIZE + random.randint(10, GRID_SIZE - 50)
-                y = row * GRID_SIZE + random.randint(10, GRID_SIZE - 50)
+        grid_cols = self.world.width // GRID_SIZE
+        grid_rows = self.world.height // GRID_SIZE
+        for row in range(2, grid_rows - 1):  
+            for col in range(1, grid_cols - 2): 
+                x = col * GRID_SIZE + self.rng.randint(10, GRID_SIZE - 50)
+                y = row * GRID_SIZE + self.rng.randint(10, GRID_SIZE - 50)
                 sectors.append((x, y))
         return sectors
     
+    def enemy_spot_is_free(self, x, y):
+        enemy_rect = pygame.Rect(x, y, 35, 35)
+        if self.wall_grid.collides(enemy_rect):
+            return False
+        
+        # At least 100px of walking from the player start, measured around
+        # walls; pockets the player can never enter are no use either
+        distance = self.distance_field.distance_to_rect(enemy_rect)
+        return distance is not None and distance >= 100
+    
     def spawn_enemies_in_grid(self, num_enemies):
        
         available_sectors = self.get_grid_sectors()
-        random.shuffle(available_sectors)
+        self.rng.shuffle(available_sectors)
         
         enemies_created = 0
         speed_multiplier = self.get_enemy_speed_multiplier()
@@ -273,28 +1300,35 @@ class Game:
                 break
             
             x, y = sector_pos
-            enemy_rect = pygame.Rect(x, y, 35, 35)
-            
-            
-            valid_spot = True
-            for wall in self.walls:
-                if enemy_rect.colliderect(wall):
-                    valid_spot = False
-                    break
-            
-         
-            player_start_distance = ((x - 40)**2 + (y - (HEIGHT - 80))**2)**0.5
-            if player_start_distance < 100:
-                valid_spot = False
-            
-            if valid_spot:
+            if self.enemy_spot_is_free(x, y):
               
-                enemy = WanderingEnemy(x, y)
+                enemy = WanderingEnemy(x, y, self.rng)
                 enemy.speed_boost *= speed_multiplier  
                 self.enemies.append(enemy)
+                self.enemy_grid.insert(enemy, enemy.rect)
+                enemies_created += 1
+        
+        # Horde variants ask for more enemies than there are sectors; scatter
+        # the rest over the open floor, with a bounded number of tries
+        if num_enemies > len(available_sectors):
+            attempts = 0
+            while enemies_created < num_enemies and attempts < num_enemies * 20:
+                attempts += 1
+                x = self.rng.randint(self.play_area.left, self.play_area.right - 35)
+                y = self.rng.randint(self.play_area.top, self.play_area.bottom - 35)
+                if not self.enemy_spot_is_free(x, y):
+                    continue
+                enemy = WanderingEnemy(x, y, self.rng)
+                enemy.speed_boost *= speed_multiplier
+                self.enemies.append(enemy)
+                self.enemy_grid.insert(enemy, enemy.rect)
                 enemies_created += 1
     
     def generate_walls(self):
+        if self.current_maze == PROCEDURAL_MAZE:
+            cols, rows = self.maze_size
+            return [pygame.Rect(wall) for wall in load_maze(cols, rows, self.maze_seed)]
+        
         frame_thickness = 15
         walls = [
             pygame.Rect(0, 0, WIDTH, frame_thickness),
@@ -341,11 +1375,45 @@ class Game:
         
         return walls
     
+    def token_spot_is_free(self, x, y):
+        token_rect = pygame.Rect(x, y, 20, 20)
+        if self.wall_grid.collides(token_rect):
+            return False
+        if self.distance_field.distance_to_rect(token_rect) is None:
+            return False
+        
+        # Tokens keep 80px apart (top-left to top-left)
+        nearby = pygame.Rect(x - 80, y - 80, 180, 180)
+        for existing_token in self.token_grid.hits(nearby):
+            distance = ((x - existing_token.rect.x)**2 + (y - existing_token.rect.y)**2)**0.5
+            if distance < 80:
+                return False
+        return True
+    
+    def token_spot_is_reachable(self, x, y):
+        # Spacing is the sampler's job; this only rules out walls and pockets
+        token_rect = pygame.Rect(x, y, 20, 20)
+        if self.wall_grid.collides(token_rect):
+            return False
+        return self.distance_field.distance_to_rect(token_rect) is not None
+    
+    def add_token(self, x, y):
+        token = Token(x, y, self.rng)
+        self.tokens.append(token)
+        self.token_grid.insert(token, token.rect)
+    
     def place_tokens_smartly(self, num_tokens):
         self.tokens = []
+        self.token_grid.clear()
         maze_choice = self.current_maze
         
-        if maze_choice == 1:
+        if maze_choice == PROCEDURAL_MAZE:
+            # Centre of every cell; the jitter below keeps them off the grid
+            corridor_middle = MAZE_WALL + (MAZE_CELL - MAZE_WALL) // 2 - 10
+            cols, rows = self.maze_size
+            good_spots = [(col * MAZE_CELL + corridor_middle, row * MAZE_CELL + corridor_middle)
+                          for col in range(cols) for row in range(rows)]
+        elif maze_choice == 1:
             good_spots = [
                 (120, 200), (350, 120), (450, 120), (680, 200),
                 (120, 350), (350, 380), (450, 380), (680, 350),
@@ -358,7 +1426,7 @@ class Game:
                 (250, 300), (550, 300), (400, 160), (400, 380)
             ]
         
-        random.shuffle(good_spots)
+        self.rng.shuffle(good_spots)
         
         placed_tokens = 0
         for spot in good_spots:
@@ -366,66 +1434,61 @@ class Game:
                 break
                 
             x, y = spot
-            x += random.randint(-30, 30)
-            y += random.randint(-30, 30)
-            x = max(40, min(WIDTH - 60, x))
-            y = max(40, min(HEIGHT - 60, y))
-            
-            token_rect = pygame.Rect(x, y, 20, 20)
-            
-            valid_spot = True
-            for wall in self.walls:
-                if token_rect.colliderect(wall):
-                    valid_spot = False
-                    break
+            x += self.rng.randint(-30, 30)
+            y += self.rng.randint(-30, 30)
+            x = max(40, min(self.world.width - 60, x))
+            y = max(40, min(self.world.height - 60, y))
             
-            for existing_token in self.tokens:
-                distance = ((x - existing_token.rect.x)**2 + (y - existing_token.rect.y)**2)**0.5
-                if distance < 80:
-                    valid_spot = False
-                    break
-            
-            if valid_spot:
-                self.tokens.append(Token(x, y))
+            if self.token_spot_is_free(x, y):
+                self.add_token(x, y)
                 placed_tokens += 1
         
-        while len(self.tokens) < num_tokens:
-            attempts = 0
-            while attempts < 50:
-                x = random.randint(60, WIDTH - 80)
-                y = random.randint(60, HEIGHT - 80)
-                token_rect = pygame.Rect(x, y, 20, 20)
-                
-                valid_spot = True
-                for wall in self.walls:
-                    if token_rect.colliderect(wall):
-                        valid_spot = False
-                        break
-                
-                for existing_token in self.tokens:
-                    distance = ((x - existing_token.rect.x)**2 + (y - existing_token.rect.y)**2)**0.5
-                    if distance < 80:
-                        valid_spot = False
-                        break
-                
-                if valid_spot:
-                    self.tokens.append(Token(x, y))
-                    break
-                
-                attempts += 1
+        if len(self.tokens) < num_tokens:
+            # Fill the rest from a Poisson-disk sample of the open floor. This
+            # always returns; a map too cramped for more tokens just gets fewer.
+            area = pygame.Rect(60, 60, self.world.width - 140, self.world.height - 140)
+            placed = [token.rect.topleft for token in self.tokens]
+            spots = poisson_disk_sample(area, 80, self.token_spot_is_reachable, self.rng, placed)
+            self.rng.shuffle(spots)
+            for x, y in spots[:num_tokens - len(self.tokens)]:
+                self.add_token(x, y)
     
     def setup_game(self):
-        self.current_maze = random.randint(1, 2)
-        self.walls = self.generate_walls()
+        # A layout whose goal cannot be walked to is thrown away
+        for _ in range(10):
+            if self.maze_size:
+                self.current_maze = PROCEDURAL_MAZE
+                self.maze_seed = self.rng.getrandbits(32)
+            else:
+                self.current_maze = self.rng.randint(1, 2)
+                self.maze_seed = None
+            self.walls = self.generate_walls()
+            start = pygame.Rect(self.player.start, self.player.rect.size)
+            self.distance_field = DistanceField(self.walls, self.world, start.center)
+            if self.distance_field.distance_to_rect(self.goal) is not None:
+                break
+        
+        self.background = None  # Rebuilt on the next draw for the new layout
+        self.wall_grid.clear()
+        for wall in self.walls:
+            self.wall_grid.insert(wall, wall)
         self.enemies = []
+        self.enemy_grid.clear()
         self.tokens = []
+        self.token_grid.clear()
+        self.pending_level = None  # Any prefetched level is for the layout being replaced
         
  
         enemy_count = self.get_current_enemy_count()
         token_count = self.get_current_token_count()
         
        
+        self.level_rng = self.rng  # What this level's enemies draw from
         self.spawn_enemies_in_grid(enemy_count)
+        if self.enemy_backend == "array":
+            self.horde = EnemyHorde(self.enemies, self.walls, self.world, self.play_area, self.rng)
+        else:
+            self.horde = None
         
  
         self.place_tokens_smartly(token_count)
@@ -434,32 +1497,228 @@ class Game:
         self.game_over = False
         self.won = False
     
+    def reset(self, seed=None, level=1):
+        # Starts over exactly as Game(seed=seed, level=level) would, keeping
+        # what does not depend on the seed (fonts, sprites, cached layouts)
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.effects_rng = random.Random(f"{self.seed} effects")
+        self.particles.reseed(self.seed)
+        self.pending_level = None
+        self.player.reset_position()
+        self.selected_dorm = self.rng.choice(EXETER_DORMS)
+        self.fade_timer = 0
+        self.screen_shake = 0
+        self.level = level
+        # setup_game() refills wall_grid in place, and after restore_state()
+        # it may be the one held in self.layouts
+        self.wall_grid = SpatialGrid()
+        self.setup_game()
+    
+    # What a level builder generates, copied onto the game when it is swapped in
+    LEVEL_STATE = ("current_maze", "maze_seed", "walls", "distance_field", "wall_grid",
+                   "enemies", "enemy_grid", "tokens", "token_grid", "horde", "level_rng")
+    
+    def level_builder(self, level, seed):
+        # A copy sharing this game's settings but none of its level state, so
+        # setup_game() can run on it off to the side
+        builder = copy.copy(self)
+        builder.level = level
+        builder.rng = random.Random(seed)
+        builder.wall_grid = SpatialGrid()
+        builder.enemy_grid = SpatialGrid()
+        builder.token_grid = SpatialGrid()
+        builder.pending_level = None
+        return builder
+    
+    def next_level(self):
+        if not self.won:
+            return 1
+        return min(self.level + 1, self.max_level)
+    
+    def prefetch_next_level(self):
+        # The seed comes from self.rng now, whichever thread builds the level,
+        # so recordings replay the same with or without the worker
+        self.prefetch_level(self.next_level(), self.rng.getrandbits(32))
+    
+    def prefetch_level(self, level, seed):
+        builder = thread = None
+        if self.prefetch:
+            builder = self.level_builder(level, seed)
+            thread = threading.Thread(target=builder.setup_game, daemon=True)
+            thread.start()
+        self.pending_level = (level, seed, builder, thread)
+    
+    def start_next_level(self):
+        level, seed, builder, thread = self.pending_level
+        self.pending_level = None
+        if thread is not None:
+            thread.join()  # Normally long finished by the time R is pressed
+        else:
+            builder = self.level_builder(level, seed)
+            builder.setup_game()
+        self.remember_layout()
+        self.level = level
+        for name in self.LEVEL_STATE:
+            setattr(self, name, getattr(builder, name))
+        self.background = None
+        self.tokens_collected = 0
+        self.game_over = False
+        self.won = False
+    
+    def remember_layout(self):
+        key = (self.current_maze, self.maze_seed)
+        self.layouts[key] = (self.walls, self.wall_grid, self.distance_field)
+        self.layouts.move_to_end(key)
+        while len(self.layouts) > LAYOUT_CACHE_SIZE:
+            self.layouts.popitem(last=False)
+    
+    def save_state(self):
+        # Everything update() depends on, packed with struct; see STATE_HEADER
+        flags = (self.game_over * STATE_GAME_OVER | self.won * STATE_WON |
+                 (self.level_rng is self.rng) * STATE_SHARED_LEVEL_RNG |
+                 (self.pending_level is not None) * STATE_PENDING_LEVEL)
+        pending_level, pending_seed = self.pending_level[:2] if self.pending_level else (0, 0)
+        cols, rows = self.maze_size or (0, 0)
+        parts = [STATE_HEADER.pack(STATE_VERSION, cols, rows, self.level, self.current_maze, self.maze_seed or 0,
+                                   self.tokens_collected, flags, self.fade_timer, self.screen_shake,
+                                   EXETER_DORMS.index(self.selected_dorm),
+                                   self.player.rect.x, self.player.rect.y, len(self.enemies), len(self.tokens),
+                                   pending_level, pending_seed),
+                 pack_rng(self.rng)]
+        if self.level_rng is not self.rng:
+            parts.append(pack_rng(self.level_rng))
+        
+        horde = self.horde
+        if horde is not None:
+            columns = (horde.x.tolist(), horde.y.tolist(), horde.w.tolist(), horde.direction_x.tolist(),
+                       horde.direction_y.tolist(), horde.move_timer.tolist(), horde.speed_boost.tolist(),
+                       horde.aggressiveness.tolist())
+            parts.extend(ENEMY_STATE.pack(*enemy) for enemy in zip(*columns))
+        else:
+            parts.extend(ENEMY_STATE.pack(e.rect.x, e.rect.y, e.rect.width, e.direction_x, e.direction_y,
+                                          e.move_timer, e.speed_boost, e.aggressiveness) for e in self.enemies)
+        parts.extend(TOKEN_STATE.pack(t.rect.x, t.rect.y, t.pulse_timer) for t in self.tokens)
+        return b"".join(parts)
+    
+    def restore_state(self, data):
+        (version, cols, rows, level, current_maze, maze_seed, tokens_collected, flags, fade_timer, screen_shake,
+         dorm, player_x, player_y, enemy_count, token_count, pending_level, pending_seed) = STATE_HEADER.unpack_from(data)
+        if version != STATE_VERSION or (cols, rows) != (self.maze_size or (0, 0)):
+            raise ValueError("State was saved by a different version or game setup")
+        offset = STATE_HEADER.size
+        
+        self.rng.setstate(unpack_rng(data, offset))
+        offset += RNG_STATE.size
+        if flags & STATE_SHARED_LEVEL_RNG:
+            self.level_rng = self.rng
+        else:
+            if self.level_rng is self.rng:
+                self.level_rng = random.Random()
+            self.level_rng.setstate(unpack_rng(data, offset))
+            offset += RNG_STATE.size
+        
+        # Layouts are regenerated from their id and seed, so they cost nothing
+        # to store, and recent ones are kept built in self.layouts
+        maze_seed = maze_seed if current_maze == PROCEDURAL_MAZE else None
+        layout_changed = (current_maze, maze_seed) != (self.current_maze, self.maze_seed)
+        if layout_changed:
+            self.remember_layout()
+            self.current_maze, self.maze_seed = current_maze, maze_seed
+            if (current_maze, maze_seed) in self.layouts:
+                self.walls, self.wall_grid, self.distance_field = self.layouts[current_maze, maze_seed]
+            else:
+                self.walls = self.generate_walls()
+                self.wall_grid = SpatialGrid()
+                for wall in self.walls:
+                    self.wall_grid.insert(wall, wall)
+                start = pygame.Rect(self.player.start, self.player.rect.size)
+                self.distance_field = DistanceField(self.walls, self.world, start.center)
+            self.background = None
+        
+        end = offset + enemy_count * ENEMY_STATE.size
+        enemies = list(ENEMY_STATE.iter_unpack(data[offset:end]))
+        offset = end
+        if layout_changed or len(self.enemies) != enemy_count:
+            self.enemies = [WanderingEnemy.from_state(x, y, size, self.level_rng, *rest) for x, y, size, *rest in enemies]
+            self.enemy_grid.clear()
+            for enemy in self.enemies:
+                self.enemy_grid.insert(enemy, enemy.rect)
+            if self.enemy_backend == "array":
+                self.horde = EnemyHorde(self.enemies, self.walls, self.world, self.play_area, self.level_rng)
+        elif self.horde is not None:
+            horde = self.horde
+            horde.rng = self.level_rng
+            columns = list(zip(*enemies)) if enemies else [()] * 8
+            horde.x[:], horde.y[:] = columns[0], columns[1]
+            horde.direction_x[:], horde.direction_y[:], horde.move_timer[:] = columns[3], columns[4], columns[5]
+            horde.speed_boost[:], horde.aggressiveness[:] = columns[6], columns[7]
+            horde.direction_change_chance = [int(120 / a) for a in columns[7]]
+        else:
+            for enemy, (x, y, _, direction_x, direction_y, move_timer, speed_boost, aggressiveness) in zip(self.enemies, enemies):
+                enemy.rect.topleft = (x, y)
+                enemy.rng = self.level_rng
+                enemy.direction_x, enemy.direction_y, enemy.move_timer = direction_x, direction_y, move_timer
+                enemy.speed_boost, enemy.aggressiveness = speed_boost, aggressiveness
+                self.enemy_grid.move(enemy)
+        
+        self.tokens = [Token.from_state(*token) for token in
+                       TOKEN_STATE.iter_unpack(data[offset:offset + token_count * TOKEN_STATE.size])]
+        self.token_grid.clear()
+        for token in self.tokens:
+            self.token_grid.insert(token, token.rect)
+        
+        self.player.rect.topleft = (player_x, player_y)
+        self.level = level
+        self.tokens_collected = tokens_collected
+        self.game_over = bool(flags & STATE_GAME_OVER)
+        self.won = bool(flags & STATE_WON)
+        self.fade_timer = fade_timer
+        self.screen_shake = screen_shake
+        self.selected_dorm = EXETER_DORMS[dorm]
+        if not flags & STATE_PENDING_LEVEL:
+            self.pending_level = None
+        elif self.pending_level is None or self.pending_level[:2] != (pending_level, pending_seed):
+            self.prefetch_level(pending_level, pending_seed)
+    
     def update(self, keys):
+        profiler = self.profiler
+        if profiler:
+            profiler.mark("other")
+        
         if not self.game_over:
-            self.player.move(keys, self.walls)
+            self.player.move(keys, self.wall_grid)
+            if profiler:
+                profiler.mark("player")
             
-            for enemy in self.enemies:
-                enemy.update(self.walls)
+            if self.horde is not None:
+                self.horde.update()
+            else:
+                for enemy in self.enemies:
+                    enemy.update(self.wall_grid, self.play_area)
+                    self.enemy_grid.move(enemy)
+            if profiler:
+                profiler.mark("enemies")
             
     
             for token in self.tokens:
                 token.update()
             
-   
-            self.particles = [p for p in self.particles if p.lifetime > 0]
-            for particle in self.particles:
-                particle.update()
-            
-            for enemy in self.enemies:
-                if self.player.rect.colliderect(enemy.rect):
-                    self.game_over = True
-                    self.fade_timer = 0
-                    self.trigger_screen_shake(15)  # Screen shake on getting caught
+            if self.horde is not None:
+                caught = self.horde.collides(self.player.rect)
+            else:
+                caught = any(self.player.rect.colliderect(enemy.rect)
+                             for enemy in self.enemy_grid.hits(self.player.rect))
+            if caught:
+                self.game_over = True
+                self.fade_timer = 0
+                self.trigger_screen_shake(15)  # Screen shake on getting caught
             
        
-            for token in self.tokens[:]:
+            for token in self.token_grid.hits(self.player.rect):
                 if self.player.rect.colliderect(token.rect):
                     self.tokens.remove(token)
+                    self.token_grid.remove(token)
                     self.tokens_collected += 1
                     # Add golden particles when collecting tokens
                     self.add_particles(token.rect.centerx, token.rect.centery, GOLD, 8)
@@ -469,31 +1728,37 @@ class Game:
                 self.won = True
                 self.game_over = True
                 # Victory particle explosion
-                self.add_particles(self.goal.centerx, self.goal.centery, CRIMSON, 15)
+                self.add_particles(self.goal.centerx, self.goal.centery, CRIMSON, self.particles.victory_burst)
+            if profiler:
+                profiler.mark("collision")
+            if self.game_over:
+                self.prefetch_next_level()
         else:
            
             if not self.won:
                 self.fade_timer += 1
         
+        # Kept running after game over so the victory burst plays out under the overlay
+        self.particles.update()
+        if profiler:
+            profiler.mark("particles")
+        
    
         if self.screen_shake > 0:
             self.screen_shake -= 1
         
         if self.game_over and keys[pygame.K_r]:
-            if self.won:
-         
-                if self.level < self.max_level:
-                    self.level += 1
-            else:
-            
-                self.level = 1
+            if self.pending_level is None:
+                self.prefetch_next_level()  # Game over was set from outside update()
             
             self.player.reset_position()
-            self.selected_dorm = random.choice(EXETER_DORMS)
+            self.selected_dorm = self.rng.choice(EXETER_DORMS)
             self.fade_timer = 0
             self.particles.clear()  # Clear particles on restart
             self.screen_shake = 0
-            self.setup_game()
+            self.start_next_level()
+            if profiler:
+                profiler.mark("level setup")
     
     def draw1(self, screen):
         screen.fill(OAK_BROWN)
@@ -524,80 +1789,84 @@ class Game:
         self.player.draw(screen)
         
     def draw(self, screen):
-        # Apply screen shake offset (ensure integers)
-        shake_x = random.randint(-self.screen_shake, self.screen_shake) if self.screen_shake > 0 else 0
-        shake_y = random.randint(-self.screen_shake, self.screen_shake) if self.screen_shake > 0 else 0
-        
-        screen.fill(OAK_BROWN)
+        profiler = self.profiler
+        if profiler:
+            profiler.mark("other")
         
-        # Draw walls with subtle depth effect
-        for wall in self.walls:
-    
-            shadow_rect = pygame.Rect(wall.x + 2 + shake_x, wall.y + 2 + shake_y, wall.width, wall.height)
-            pygame.draw.rect(screen, DARK_OAK, shadow_rect)
-
-            wall_rect = pygame.Rect(wall.x + shake_x, wall.y + shake_y, wall.width, wall.height)
-            pygame.draw.rect(screen, WHITE, wall_rect)
-
-        goal_border = pygame.Rect(self.goal.x - 3 + shake_x, self.goal.y - 3 + shake_y, 
-                                 self.goal.width + 6, self.goal.height + 6)
-        pygame.draw.rect(screen, DARK_OAK, goal_border)
-        goal_rect = pygame.Rect(self.goal.x + shake_x, self.goal.y + shake_y, self.goal.width, self.goal.height)
-        pygame.draw.rect(screen, GREEN, goal_rect)
+        # Apply screen shake offset (ensure integers)
+        shake_x = self.effects_rng.randint(-self.screen_shake, self.screen_shake) if self.screen_shake > 0 else 0
+        shake_y = self.effects_rng.randint(-self.screen_shake, self.screen_shake) if self.screen_shake > 0 else 0
+        self.camera.shake = (shake_x, shake_y)
+        self.camera.follow(self.player.rect)
         
-    
-        for particle in self.particles:
-            particle.draw(screen)
+        if self.background is None:
+            self.background = BackgroundTiles(self)
         
-
-        for token in self.tokens:
-            # Temporarily adjust token position for screen shake
-            original_x, original_y = token.rect.x, token.rect.y
-            token.rect.x += shake_x
-            token.rect.y += shake_y
-            token.draw(screen)
-            token.rect.x, token.rect.y = original_x, original_y
+        # Walls and goal shift with the shake; the frame strips filled below
+        # stay put and cover the up-to-15px margin this exposes
+        view = self.camera.view
+        if not self.world.contains(view):
+            screen.fill(OAK_BROWN)
+        self.background.blit(screen, view.clip(self.world), (shake_x, shake_y))
+        if profiler:
+            profiler.mark("walls")
         
-
-        for enemy in self.enemies:
-            original_x, original_y = enemy.rect.x, enemy.rect.y
-            enemy.rect.x += shake_x
-            enemy.rect.y += shake_y
-            enemy.draw(screen)
-            enemy.rect.x, enemy.rect.y = original_x, original_y
+        self.draw_entities(screen)
+        if profiler:
+            profiler.mark("entities")
         
        
-        original_x, original_y = self.player.rect.x, self.player.rect.y
-        self.player.rect.x += shake_x
-        self.player.rect.y += shake_y
-        self.player.draw(screen)
-        self.player.rect.x, self.player.rect.y = original_x, original_y
+        for strip in FRAME_STRIPS:
+            screen.fill(LIGHT_GREY, strip)
         
-       
-        frame_thickness = 15
-       
-        pygame.draw.rect(screen, LIGHT_GREY, (0, 0, WIDTH, frame_thickness))
-      
-        pygame.draw.rect(screen, LIGHT_GREY, (0, HEIGHT - frame_thickness, WIDTH, frame_thickness))
-       
-        pygame.draw.rect(screen, LIGHT_GREY, (0, 0, frame_thickness, HEIGHT))
-       
-        pygame.draw.rect(screen, LIGHT_GREY, (WIDTH - frame_thickness, 0, frame_thickness, HEIGHT))
+        self.draw_hud(screen)
+        self.draw_overlay(screen)
+        if profiler:
+            profiler.mark("text")
+    
+    def visible_enemies(self, view):
+        if self.horde is not None:
+            return self.horde.visible(view)
+        return self.enemy_grid.hits(view)
+    
+    def draw_entities(self, screen):
+        # Draws at camera offset without touching entity rects
+        offset = self.camera.offset
+        view = self.camera.cull_rect()
+        
+        self.particles.draw(screen, offset, view)
         
-     
-        progress_text = self.font.render(f"Tokens: {self.tokens_collected}/{self.tokens_collected + len(self.tokens)}", True, WHITE)
-        progress_shadow = self.font.render(f"Tokens: {self.tokens_collected}/{self.tokens_collected + len(self.tokens)}", True, DARK_OAK)
+        # Tokens, then enemies, then the player on top, in a single call
+        batch = [token.blit_args(offset) for token in self.token_grid.hits(view)]
+        batch.extend(enemy.blit_args(offset) for enemy in self.visible_enemies(view))
+        batch.append(self.player.blit_args(offset))
+        screen.blits(batch, False)
+    
+    def entity_bounds(self):
+        # World areas draw_entities() can touch this frame, tokens at full pulse
+        view = self.camera.cull_rect()
+        bounds = [self.player.rect.inflate(4, 4)]
+        bounds.extend(enemy.rect.inflate(2, 2) for enemy in self.visible_enemies(view))
+        bounds.extend(token.rect.inflate(6, 6) for token in self.token_grid.hits(view))
+        particle_bounds = self.particles.bounds()
+        if particle_bounds is not None:
+            bounds.append(particle_bounds)
+        return bounds
+    
+    def draw_hud(self, screen):
+        progress_text = self.text_cache.render(self.font, f"Tokens: {self.tokens_collected}/{self.tokens_collected + len(self.tokens)}", WHITE)
+        progress_shadow = self.text_cache.render(self.font, f"Tokens: {self.tokens_collected}/{self.tokens_collected + len(self.tokens)}", DARK_OAK)
         text_x = WIDTH // 2 - progress_text.get_width() // 2
         screen.blit(progress_shadow, (text_x + 2, 12))
         screen.blit(progress_text, (text_x, 10))
-        
+        self.hud_rect = pygame.Rect(text_x, 10, progress_text.get_width() + 2, progress_text.get_height() + 2)
+        return self.hud_rect
+    
+    def draw_overlay(self, screen):
         if self.game_over:
             if self.won:
                 
-                overlay = pygame.Surface((WIDTH, HEIGHT))
-                overlay.set_alpha(128)
-                overlay.fill(DARK_OAK)
-                screen.blit(overlay, (0, 0))
+                screen.blit(SPRITES.shade(WIDTH, HEIGHT, DARK_OAK, 128), (0, 0))
                 
               
                 if self.exeter_seal:
@@ -607,28 +1876,28 @@ class Game:
                 
                 
                 if self.level < self.max_level:
-                    victory_text = self.title_font.render(f"Welcome to {self.selected_dorm}!", True, CRIMSON)
-                    victory_shadow = self.title_font.render(f"Welcome to {self.selected_dorm}!", True, DARK_OAK)
+                    victory_text = self.text_cache.render(self.title_font, f"Welcome to {self.selected_dorm}!", CRIMSON)
+                    victory_shadow = self.text_cache.render(self.title_font, f"Welcome to {self.selected_dorm}!", DARK_OAK)
                     text_x = WIDTH // 2 - victory_text.get_width() // 2
                     text_y = HEIGHT // 2 + 40
                     screen.blit(victory_shadow, (text_x + 2, text_y + 2))
                     screen.blit(victory_text, (text_x, text_y))
                     
                    
-                    level_advance_text = self.font.render(f"Level {self.level} Complete! Advancing to Level {self.level + 1}", True, GOLD)
+                    level_advance_text = self.text_cache.render(self.font, f"Level {self.level} Complete! Advancing to Level {self.level + 1}", GOLD)
                     level_x = WIDTH // 2 - level_advance_text.get_width() // 2
                     screen.blit(level_advance_text, (level_x, text_y + 50))
                 else:
                    
-                    victory_text = self.title_font.render("You skipped so many assemblys you get stricts for life! Congrats!", True, GOLD)
-                    victory_shadow = self.title_font.render("4 Life!", True, DARK_OAK)
+                    victory_text = self.text_cache.render(self.title_font, "You skipped so many assemblys you get stricts for life! Congrats!", GOLD)
+                    victory_shadow = self.text_cache.render(self.title_font, "4 Life!", DARK_OAK)
                     text_x = WIDTH // 2 - victory_text.get_width() // 2
                     text_y = HEIGHT // 2 + 40
                     screen.blit(victory_shadow, (text_x + 2, text_y + 2))
                     screen.blit(victory_text, (text_x, text_y))
                     
                     
-                    master_text = self.font.render(f"You conquered all 10 levels at {self.selected_dorm}!", True, WHITE)
+                    master_text = self.text_cache.render(self.font, f"You conquered all 10 levels at {self.selected_dorm}!", WHITE)
                     master_x = WIDTH // 2 - master_text.get_width() // 2
                     screen.blit(master_text, (master_x, text_y + 50))
                 
@@ -637,43 +1906,562 @@ class Game:
                 if self.fade_timer < self.fade_duration:
                     # Fade to black effect
                     fade_alpha = min(255, (self.fade_timer * 255) // self.fade_duration)
-                    fade_overlay = pygame.Surface((WIDTH, HEIGHT))
-                    fade_overlay.set_alpha(fade_alpha)
-                    fade_overlay.fill(BLACK)
-                    screen.blit(fade_overlay, (0, 0))
+                    screen.blit(SPRITES.shade(WIDTH, HEIGHT, BLACK, fade_alpha), (0, 0))
                 else:
                   
                     screen.fill(BLACK)
                     
-                    fail_text = self.title_font.render("Caught by Mx Elle!", True, RED)
+                    fail_text = self.text_cache.render(self.title_font, "Caught by Mx Elle!", RED)
                     text_x = WIDTH // 2 - fail_text.get_width() // 2
                     text_y = HEIGHT // 2 - 20
                     screen.blit(fail_text, (text_x, text_y))
                     
 
-                    restart_text = self.font.render("Press R to restart or get stricts", True, WHITE)
+                    restart_text = self.text_cache.render(self.font, "Press R to restart or get stricts", WHITE)
                     restart_x = WIDTH // 2 - restart_text.get_width() // 2
                     restart_y = HEIGHT // 2 + 40
                     screen.blit(restart_text, (restart_x, restart_y))
 
-def main():
-    game = Game()
+class DirtyRectRenderer:
+    # Redraws only what moved: restores the previous and current entity areas
+    # from the cached background and returns them for display.update(). Falls
+    # back to a full Game.draw() (returning None, i.e. flip) on level changes,
+    # while the screen shakes and under full-screen overlays.
+    def __init__(self):
+        self.background = None
+        self.view = None
+        self.previous = []
+        self.hud = None
+        self.clean = False  # Screen holds an unshaken, overlay-free frame
+    
+    def draw(self, game, screen):
+        settled = game.screen_shake == 0 and not game.game_over
+        game.camera.follow(game.player.rect)
+        if not (settled and self.clean and game.background is self.background
+                and game.camera.view == self.view):
+            game.draw(screen)
+            self.clean = settled
+            self.background = game.background
+            self.view = game.camera.view.copy()
+            self.previous = self.to_screen(game, game.entity_bounds())
+            self.hud = (game.hud_rect, game.tokens_collected, len(game.tokens))
+            return None
+        
+        game.camera.shake = (0, 0)
+        current = self.to_screen(game, game.entity_bounds())
+        dirty = self.previous + current
+        for rect in dirty:
+            self.restore(game, screen, rect)
+        # Anti-aliased text would darken if drawn over itself, so its area is
+        # always restored; it is only pushed to the display when it changes
+        self.restore(game, screen, self.hud[0])
+        
+        game.draw_entities(screen)
+        for strip in FRAME_STRIPS:
+            screen.fill(LIGHT_GREY, strip)
+        hud_rect = game.draw_hud(screen)
+        hud = (hud_rect, game.tokens_collected, len(game.tokens))
+        if hud != self.hud:
+            dirty.append(self.hud[0])
+            dirty.append(hud_rect)
+            self.hud = hud
+        
+        self.previous = current
+        return dirty
+    
+    def to_screen(self, game, rects):
+        screen_rect = pygame.Rect(0, 0, WIDTH, HEIGHT)
+        offset = game.camera.offset
+        return [rect.move(offset).clip(screen_rect) for rect in rects
+                if rect.move(offset).colliderect(screen_rect)]
+    
+    def restore(self, game, screen, rect):
+        # The camera never scrolls past the world's top-left, so only the
+        # right and bottom can fall outside a small world
+        world_rect = rect.move(game.camera.view.topleft)
+        if not game.world.contains(world_rect):
+            screen.fill(OAK_BROWN, rect)
+        game.background.blit(screen, world_rect.clip(game.world), rect.topleft)
+
+PROFILE_PHASES = ["input", "player", "enemies", "collision", "particles", "level setup",
+                  "walls", "entities", "text", "profiler", "flip", "idle", "other"]
+
+# Render backends. Everything Game.draw() and FrameProfiler.draw() do to the
+# screen is fill(color, rect=None), blit(surface, dest, area=None) and
+# blits(pairs, doreturn): the software backend's screen is the window
+# surface itself, and TextureScreen offers the same calls on an SDL renderer.
+# A backend's present(dirty=None) shows the frame.
+SDL_BLENDMODE_BLEND = 1
+
+class SoftwareDisplay:
+    # The default: pygame's window surface, drawn on by the CPU
+    supports_dirty_rects = True
+    
+    def __init__(self, size, title):
+        self.screen = pygame.display.set_mode(size)
+        pygame.display.set_caption(title)
+    
+    def present(self, dirty=None):
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+
+class TextureScreen:
+    # Surface-like target drawing through a pygame._sdl2 Renderer. Each
+    # surface is uploaded once, as a texture kept until the surface itself is
+    # freed, so it must not be drawn into after its first blit; its alpha is
+    # read on every blit, so SPRITES.shade() fades still work.
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.textures = weakref.WeakKeyDictionary()
+    
+    def texture(self, surface):
+        texture = self.textures.get(surface)
+        if texture is None:
+            texture = sdl2_video.Texture.from_surface(self.renderer, surface)
+            if surface.get_alpha() is not None:
+                texture.blend_mode = SDL_BLENDMODE_BLEND
+            self.textures[surface] = texture
+        alpha = surface.get_alpha()
+        texture.alpha = 255 if alpha is None else alpha
+        return texture
+    
+    def fill(self, color, rect=None):
+        self.renderer.draw_color = pygame.Color(color)
+        if rect is None:
+            self.renderer.clear()
+            return
+        rect = pygame.Rect(rect)
+        if rect.width > 0 and rect.height > 0:  # SDL would still draw a line
+            self.renderer.fill_rect(rect)
+    
+    def blit(self, source, dest, area=None):
+        texture = self.texture(source)
+        if area is None:
+            texture.draw(dstrect=(dest[0], dest[1], texture.width, texture.height))
+        else:
+            area = pygame.Rect(area)
+            texture.draw(srcrect=area, dstrect=(dest[0], dest[1], area.width, area.height))
+    
+    def blits(self, blit_sequence, doreturn=True):
+        texture_for = self.texture
+        for source, dest in blit_sequence:
+            texture = texture_for(source)
+            texture.draw(dstrect=(dest[0], dest[1], texture.width, texture.height))
+
+class TextureDisplay:
+    # Hardware path: sprites, text and background tiles become textures and
+    # full-screen fades are blended by the renderer. driver names an SDL
+    # render driver ("software" runs it without a GPU; SDL_RENDER_DRIVER does
+    # the same from the environment). The back buffer is not kept between
+    # frames, so every frame is drawn in full.
+    supports_dirty_rects = False
+    
+    def __init__(self, size, title, driver=None):
+        if sdl2_video is None:
+            raise RuntimeError("The texture renderer requires pygame._sdl2")
+        index = -1
+        if driver is not None:
+            names = [info.name for info in sdl2_video.get_drivers()]
+            if driver not in names:
+                raise ValueError(f"unknown SDL render driver {driver!r}, have {names}")
+            index = names.index(driver)
+        self.window = sdl2_video.Window(title, size)
+        self.renderer = sdl2_video.Renderer(self.window, index=index)
+        self.screen = TextureScreen(self.renderer)
+    
+    def present(self, dirty=None):
+        self.renderer.present()
+
+RENDER_BACKENDS = {"software": SoftwareDisplay, "texture": TextureDisplay}
+
+def percentile(values, fraction):
+    # Nearest-rank percentile, shared by the benchmark and playtest reports
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+class FrameProfiler:
+    # Per-phase frame timings in a fixed-size ring buffer. Each mark() charges
+    # the time since the previous mark to the named phase; with no profiler
+    # attached the hooks cost one truth test each.
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.phases = PROFILE_PHASES
+        self.phase_index = {name: i for i, name in enumerate(self.phases)}
+        self.timings = array("d", bytes(8 * capacity * len(self.phases)))
+        self.totals = array("d", bytes(8 * capacity))
+        self.frames = 0  # Frames recorded so far; the newest is frames - 1
+        self.show_overlay = False
+        self.frame_start = self.last = time.perf_counter()
+    
+    def begin_frame(self):
+        row = (self.frames % self.capacity) * len(self.phases)
+        for i in range(row, row + len(self.phases)):
+            self.timings[i] = 0.0
+        self.frame_start = self.last = time.perf_counter()
+    
+    def mark(self, phase):
+        now = time.perf_counter()
+        row = (self.frames % self.capacity) * len(self.phases)
+        self.timings[row + self.phase_index[phase]] += now - self.last
+        self.last = now
+    
+    def end_frame(self):
+        self.mark("other")
+        self.totals[self.frames % self.capacity] = self.last - self.frame_start
+        self.frames += 1
+    
+    def recent(self, count):
+        # Slots of the last `count` finished frames, oldest first
+        count = min(count, self.frames, self.capacity)
+        return [(self.frames - count + i) % self.capacity for i in range(count)]
+    
+    def averages(self, count=60):
+        slots = self.recent(count)
+        width = len(self.phases)
+        sums = [0.0] * width
+        for slot in slots:
+            row = slot * width
+            for i in range(width):
+                sums[i] += self.timings[row + i]
+        return [total * 1000 / max(len(slots), 1) for total in sums]
+    
+    def rows(self):
+        width = len(self.phases)
+        for number, slot in enumerate(self.recent(self.capacity)):
+            frame = self.frames - min(self.frames, self.capacity) + number
+            phases = self.timings[slot * width:(slot + 1) * width]
+            yield frame, self.totals[slot] * 1000, [t * 1000 for t in phases]
+    
+    def export(self, path):
+        # CSV or JSON by extension, one row per buffered frame, in ms
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame", "total_ms"] + [f"{name}_ms" for name in self.phases])
+                for frame, total, phases in self.rows():
+                    writer.writerow([frame, f"{total:.4f}"] + [f"{t:.4f}" for t in phases])
+        else:
+            with open(path, "w") as f:
+                json.dump({"phases": self.phases,
+                           "frames": [{"frame": frame, "total_ms": total, "phases_ms": phases}
+                                      for frame, total, phases in self.rows()]}, f)
+    
+    def draw(self, screen, text_cache, font):
+        panel = pygame.Rect(WIDTH - 250, 40, 230, 20 + 18 * len(self.phases) + 70)
+        screen.blit(SPRITES.shade(panel.width, panel.height, BLACK, 190), panel)
+        
+        # Rolling per-phase milliseconds with bars on a 16 ms scale
+        y = panel.y + 8
+        for name, ms in zip(self.phases, self.averages()):
+            screen.blit(text_cache.render(font, name, WHITE), (panel.x + 8, y))
+            value = text_cache.render(font, f"{ms:.2f}", WHITE)
+            screen.blit(value, (panel.right - 84 - value.get_width(), y))
+            bar_width = min(int(ms / 16.0 * 70), 70)
+            if bar_width:
+                screen.fill(GOLD, (panel.right - 78, y + 4, bar_width, 8))
+            y += 18
+        
+        # Frame-time graph, newest on the right, with a line at 16.7 ms
+        # Fills only, so this draws on either render backend
+        graph = pygame.Rect(panel.x + 8, y + 8, panel.width - 16, 50)
+        for edge in ((graph.x, graph.y, graph.width, 1), (graph.x, graph.bottom - 1, graph.width, 1),
+                     (graph.x, graph.y, 1, graph.height), (graph.right - 1, graph.y, 1, graph.height)):
+            screen.fill(LIGHT_GREY, edge)
+        budget_y = graph.bottom - int(graph.height * (1000 / 60) / 33.3)
+        screen.fill(GREEN, (graph.left, budget_y, graph.width, 1))
+        slots = self.recent(graph.width - 2)
+        for i, slot in enumerate(slots):
+            height = min(int(self.totals[slot] * 1000 / 33.3 * graph.height), graph.height - 2)
+            x = graph.right - 2 - (len(slots) - 1 - i)
+            screen.fill(RED if self.totals[slot] > 1 / 60 else YELLOW, (x, graph.bottom - 1 - height, 1, height))
+
+class FixedTimestep:
+    # Accumulates real time and hands out whole simulation steps, so gameplay
+    # runs at SIM_RATE no matter how fast frames are rendered
+    def __init__(self, rate=SIM_RATE, max_steps=MAX_CATCH_UP_STEPS):
+        self.step = 1.0 / rate
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+    
+    def advance(self, elapsed, speed=1):
+        self.accumulator += elapsed * speed
+        steps = int(self.accumulator / self.step)
+        limit = self.max_steps * speed
+        if steps > limit:
+            # Too far behind (e.g. the window was dragged); skip ahead rather
+            # than spiral trying to catch up
+            steps = limit
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.step
+        return steps
+
+def run_headless(game, ticks, policy=None):
+    # Steps the simulation as fast as the CPU allows: no drawing, no clock.
+    # policy(game, tick) returns a key state; None means no keys held.
+    for tick in range(ticks):
+        keys = policy(game, tick) if policy else NO_KEYS
+        game.update(keys)
+    return game
+
+# The only keys the simulation reads, one bit each in a recorded tick
+RECORDED_KEYS = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN,
+                 pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s, pygame.K_r]
+MASK_KEYS = [KeyState(key for bit, key in enumerate(RECORDED_KEYS) if mask >> bit & 1)
+             for mask in range(1 << len(RECORDED_KEYS))]
+CHECKSUM_INTERVAL = 60
+RECORDING_MAGIC = b"DDRP"
+RECORDING_HEADER = struct.Struct("<4sBIHHIII")  # magic, version, seed, cols, rows, interval, runs, checksums
+
+def key_mask(keys):
+    mask = 0
+    for bit, key in enumerate(RECORDED_KEYS):
+        if keys[key]:
+            mask |= 1 << bit
+    return mask
+
+def state_checksum(game):
+    # CRC of everything a divergence would show up in
+    if game.horde is not None:
+        game.horde.sync()
+    values = [game.level, game.tokens_collected, game.game_over, game.won,
+              game.current_maze, game.maze_seed or 0, *game.player.rect]
+    for enemy in game.enemies:
+        values.extend((*enemy.rect, enemy.direction_x, enemy.direction_y, enemy.move_timer))
+    for token in game.tokens:
+        values.extend(token.rect.topleft)
+    return zlib.crc32(array("q", values).tobytes())
+
+class InputRecording:
+    # A session as its seed plus the key mask held on every tick, stored as
+    # (mask, run length) pairs since keys stay down for many ticks at a time
+    def __init__(self, seed, maze_size=None, interval=CHECKSUM_INTERVAL):
+        self.seed = seed
+        self.maze_size = maze_size
+        self.interval = interval
+        self.masks = array("H")
+        self.counts = array("I")
+        self.checksums = array("I")
+        self.ticks = 0
+    
+    def step(self, game, keys):
+        # Records keys for one tick, then runs it
+        mask = key_mask(keys)
+        if self.masks and self.masks[-1] == mask:
+            self.counts[-1] += 1
+        else:
+            self.masks.append(mask)
+            self.counts.append(1)
+        game.update(keys)
+        self.ticks += 1
+        if self.ticks % self.interval == 0:
+            self.checksums.append(state_checksum(game))
+    
+    def save(self, path):
+        cols, rows = self.maze_size or (0, 0)
+        runs = len(self.masks)
+        with open(path, "wb") as f:
+            f.write(RECORDING_HEADER.pack(RECORDING_MAGIC, 1, self.seed, cols, rows,
+                                          self.interval, runs, len(self.checksums)))
+            f.write(struct.pack(f"<{runs}H", *self.masks))
+            f.write(struct.pack(f"<{runs}I", *self.counts))
+            f.write(struct.pack(f"<{len(self.checksums)}I", *self.checksums))
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, cols, rows, interval, runs, checks = RECORDING_HEADER.unpack_from(data)
+        if magic != RECORDING_MAGIC or version != 1:
+            raise ValueError(f"{path} is not a Dorm Dash recording")
+        recording = cls(seed, (cols, rows) if cols else None, interval)
+        offset = RECORDING_HEADER.size
+        recording.masks = array("H", struct.unpack_from(f"<{runs}H", data, offset))
+        offset += runs * 2
+        recording.counts = array("I", struct.unpack_from(f"<{runs}I", data, offset))
+        offset += runs * 4
+        recording.checksums = array("I", struct.unpack_from(f"<{checks}I", data, offset))
+        recording.ticks = sum(recording.counts)
+        return recording
+
+def replay(recording, enemy_backend="objects"):
+    # Re-runs a recording headless, as fast as possible. Returns the game and
+    # the first tick whose checksum disagrees with the recording, or None.
+    game = Game(headless=True, enemy_backend=enemy_backend,
+                maze_size=recording.maze_size, seed=recording.seed)
+    interval = recording.interval
+    checksums = recording.checksums
+    tick = 0
+    for mask, count in zip(recording.masks, recording.counts):
+        keys = MASK_KEYS[mask]
+        for _ in range(count):
+            game.update(keys)
+            tick += 1
+            if tick % interval == 0 and tick // interval <= len(checksums):
+                if state_checksum(game) != checksums[tick // interval - 1]:
+                    return game, tick
+    return game, None
+
+class RewindBuffer:
+    # The last `seconds` of Game.save_state() snapshots. Every
+    # keyframe_interval-th snapshot is kept whole; the ones after it only as
+    # their XOR against it, which is mostly zeros and compresses to a few
+    # dozen bytes. Whole groups are dropped from the old end, so memory stays
+    # at about one group over capacity.
+    def __init__(self, seconds=30, rate=SIM_RATE, keyframe_interval=SIM_RATE):
+        self.capacity = int(seconds * rate)
+        self.keyframe_interval = keyframe_interval
+        self.groups = deque()  # [compressed keyframe, [(length, compressed XOR), ...]]
+        self.keyframe = None  # Newest keyframe, uncompressed
+        self.frames = 0
+    
+    def __len__(self):
+        return self.frames
+    
+    def nbytes(self):
+        return sum(len(keyframe) + sum(len(delta) for _, delta in deltas) for keyframe, deltas in self.groups)
+    
+    def clear(self):
+        self.groups.clear()
+        self.keyframe = None
+        self.frames = 0
+    
+    def push(self, game):
+        state = game.save_state()
+        if not self.groups or len(self.groups[-1][1]) + 1 >= self.keyframe_interval:
+            self.groups.append([zlib.compress(state, 1), []])
+            self.keyframe = state
+        else:
+            size = max(len(state), len(self.keyframe))
+            delta = (int.from_bytes(state, "little") ^ int.from_bytes(self.keyframe, "little")).to_bytes(size, "little")
+            self.groups[-1][1].append((len(state), zlib.compress(delta, 1)))
+        self.frames += 1
+        
+        while self.frames - (len(self.groups[0][1]) + 1) >= self.capacity:
+            self.frames -= len(self.groups.popleft()[1]) + 1
+    
+    def pop(self):
+        # Removes and returns the newest snapshot, or None once empty
+        if not self.groups:
+            return None
+        self.frames -= 1
+        keyframe, deltas = self.groups[-1]
+        if not deltas:
+            self.groups.pop()
+            state = self.keyframe
+            self.keyframe = zlib.decompress(self.groups[-1][0]) if self.groups else None
+            return state
+        length, delta = deltas.pop()
+        delta = zlib.decompress(delta)
+        return (int.from_bytes(delta, "little") ^ int.from_bytes(self.keyframe, "little")).to_bytes(len(delta), "little")[:length]
+    
+    def rewind(self, game):
+        state = self.pop()
+        if state is None:
+            return False
+        game.restore_state(state)
+        return True
+
+def save_game(game, path):
+    with open(path, "wb") as f:
+        f.write(SAVE_MAGIC + zlib.compress(game.save_state()))
+
+def load_game(game, path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(SAVE_MAGIC):
+        raise ValueError(f"{path} is not a Dorm Dash save")
+    game.restore_state(zlib.decompress(data[len(SAVE_MAGIC):]))
+
+def main(dirty_rects=False, profile=False, record=None, renderer="software"):
+    # Only the display; fonts are started by the asset manager, and audio and
+    # joysticks are never used
+    pygame.display.init()
+    display = RENDER_BACKENDS[renderer]((WIDTH, HEIGHT), "Phillips Exeter Academy - Dorm Dash")
+    screen = display.screen
+    clock = pygame.time.Clock()
+    
+    game = Game(prefetch=True)
+    # --record PATH saves the session for replay.py when the window closes
+    recording = InputRecording(game.seed, game.maze_size) if record else None
+    # Holding Backspace rewinds; off while recording, which only stores keys
+    rewind = RewindBuffer() if recording is None else None
+    renderer = DirtyRectRenderer() if dirty_rects and display.supports_dirty_rects else None
+    if profile:
+        game.profiler = FrameProfiler()
+    timestep = FixedTimestep()
     running = True
+    previous = time.perf_counter()
     
     while running:
+        profiler = game.profiler
+        if profiler:
+            profiler.begin_frame()
+        
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                # F3 starts recording on first use and toggles the overlay
+                if game.profiler is None:
+                    game.profiler = profiler = FrameProfiler()
+                    profiler.begin_frame()
+                profiler.show_overlay = not profiler.show_overlay
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and profiler:
+                profiler.export(time.strftime("profile_%Y%m%d_%H%M%S.csv"))
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                save_game(game, SAVE_PATH)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F9 and recording is None:
+                if os.path.exists(SAVE_PATH):
+                    load_game(game, SAVE_PATH)
+                    rewind.clear()
         
         keys = pygame.key.get_pressed()
-        game.update(keys)
-        game.draw(screen)
+        if profiler:
+            profiler.mark("input")
+        now = time.perf_counter()
+        speed = FAST_FORWARD if keys[pygame.K_TAB] else 1
+        for _ in range(timestep.advance(now - previous, speed)):
+            if recording is not None:
+                recording.step(game, keys)
+            elif keys[pygame.K_BACKSPACE]:
+                rewind.rewind(game)
+            else:
+                # Frozen after game over, so only frames in play are kept
+                if not game.game_over:
+                    rewind.push(game)
+                game.update(keys)
+        previous = now
+        
+        if renderer is not None:
+            dirty = renderer.draw(game, screen)
+        else:
+            dirty = None
+            game.draw(screen)
+        
+        if profiler and profiler.show_overlay:
+            profiler.draw(screen, game.text_cache, game.small_font)
+            profiler.mark("profiler")
+            dirty = None
+            if renderer is not None:
+                renderer.clean = False  # The panel is not part of its bookkeeping
         
-        pygame.display.flip()
-        clock.tick(60)
+        display.present(dirty)
+        if profiler:
+            profiler.mark("flip")
+        clock.tick(RENDER_FPS)
+        if profiler:
+            profiler.mark("idle")
+            profiler.end_frame()
     
+    if recording is not None:
+        recording.save(record)
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
+    record = sys.argv[sys.argv.index("--record") + 1] if "--record" in sys.argv else None
+    renderer = sys.argv[sys.argv.index("--renderer") + 1] if "--renderer" in sys.argv else "software"
+    main(dirty_rects="--dirty-rects" in sys.argv, profile="--profile" in sys.argv, record=record, renderer=renderer)
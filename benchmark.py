@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+# Benchmarks run without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from Finalproject import Game, KeyState, TextureDisplay, WIDTH, HEIGHT, GOLD, percentile
+
+MOVE_KEYS = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN]
+
+def level_config(level):
+    def build():
+        game = Game()
+        game.level = level
+        game.setup_game()
+        return game
+    return build
+
+def horde_config(count, backend):
+    def build():
+        game = Game(enemy_backend=backend)
+        game.base_enemies = game.max_enemies = count
+        game.setup_game()
+        return game
+    return build
+
+def maze_config(cols, rows):
+    def build():
+        return Game(maze_size=(cols, rows))
+    return build
+
+def particle_config(count):
+    def build():
+        game = Game()
+        # Topped up every frame by run_frames() to stay near count
+        game.particle_target = count
+        return game
+    return build
+
+def all_configs(max_level):
+    configs = {f"level-{level}": level_config(level) for level in range(1, max_level + 1)}
+    configs.update({
+        "horde-objects-300": horde_config(300, "objects"),
+        "horde-array-300": horde_config(300, "array"),
+        "horde-array-2000": horde_config(2000, "array"),
+        "particles-10000": particle_config(10000),
+        "maze-60x60": maze_config(60, 60),
+    })
+    return configs
+
+def scripted_keys(rng):
+    # A seeded random walk, changing direction every 30 frames
+    keys = KeyState()
+    frame = 0
+    while True:
+        if frame % 30 == 0:
+            keys = KeyState({rng.choice(MOVE_KEYS), rng.choice(MOVE_KEYS)})
+        yield keys
+        frame += 1
+
+def step(game, keys, surface, present=None):
+    target = getattr(game, "particle_target", 0)
+    if target and len(game.particles) < target:
+        game.add_particles(WIDTH // 2, HEIGHT // 2, GOLD, min(2000, target - len(game.particles)))
+
+    start = time.perf_counter()
+    game.update(keys)
+    middle = time.perf_counter()
+    game.draw(surface)
+    if present is not None:
+        present()  # The renderer only finishes its queued draws here
+    end = time.perf_counter()
+
+    if game.game_over:
+        # Stay on the configured level rather than following the restart rules
+        game.player.reset_position()
+        game.setup_game()
+    return middle - start, end - middle
+
+def run_frames(build, seed, frames, surface, present=None):
+    random.seed(seed)
+    game = build()
+    keys = scripted_keys(random.Random(seed))
+    update_times, draw_times = [], []
+    for _ in range(frames):
+        update_time, draw_time = step(game, next(keys), surface, present)
+        update_times.append(update_time)
+        draw_times.append(draw_time)
+    return update_times, draw_times
+
+def measure_allocations(build, seed, frames, surface, present=None):
+    # Separate pass: tracing slows everything down, so it must not share a
+    # run with the timings. Reports bytes allocated within each frame (the
+    # traced peak above the frame's starting point) and net new blocks.
+    random.seed(seed)
+    game = build()
+    keys = scripted_keys(random.Random(seed))
+    frame_bytes, frame_blocks = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(frames):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            blocks = sys.getallocatedblocks()
+            step(game, next(keys), surface, present)
+            _, peak = tracemalloc.get_traced_memory()
+            frame_bytes.append(peak - current)
+            frame_blocks.append(sys.getallocatedblocks() - blocks)
+    finally:
+        tracemalloc.stop()
+    return frame_bytes, frame_blocks
+
+def summarize_times(values):
+    return {
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+    }
+
+def render_target(renderer, driver):
+    # (surface, present) for the software or texture backend
+    pygame.display.init()
+    if renderer == "texture":
+        display = TextureDisplay((WIDTH, HEIGHT), "Dorm Dash benchmark", driver)
+        return display.screen, display.present
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    return pygame.Surface((WIDTH, HEIGHT)).convert(), None
+
+def run_suite(configs, frames, alloc_frames, seed, renderer="software", driver=None):
+    surface, present = render_target(renderer, driver)
+
+    results = {}
+    for name, build in configs.items():
+        update_times, draw_times = run_frames(build, seed, frames, surface, present)
+        frame_times = [u + d for u, d in zip(update_times, draw_times)]
+        frame_bytes, frame_blocks = measure_allocations(build, seed, alloc_frames, surface, present)
+        results[name] = {
+            "update": summarize_times(update_times),
+            "draw": summarize_times(draw_times),
+            "frame": summarize_times(frame_times),
+            "alloc_kb_per_frame": sum(frame_bytes) / len(frame_bytes) / 1024,
+            "blocks_per_frame": sum(frame_blocks) / len(frame_blocks),
+        }
+        print_result(name, results[name])
+    return results
+
+def print_result(name, result):
+    print(f"{name:<20} "
+          f"update p50/p95/p99 {result['update']['p50_ms']:6.2f} {result['update']['p95_ms']:6.2f} {result['update']['p99_ms']:6.2f} ms  "
+          f"draw {result['draw']['p50_ms']:6.2f} {result['draw']['p95_ms']:6.2f} {result['draw']['p99_ms']:6.2f} ms  "
+          f"alloc {result['alloc_kb_per_frame']:7.1f} KB/frame")
+
+def compare(results, baseline, threshold):
+    # Lists every phase whose p95 got slower than baseline by more than threshold
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for phase in ("update", "draw", "frame"):
+            old = baseline[name][phase]["p95_ms"]
+            new = result[phase]["p95_ms"]
+            change = (new - old) / old if old > 0 else 0.0
+            marker = "  REGRESSION" if change > threshold else ""
+            print(f"{name:<20} {phase:<6} p95 {old:7.2f} -> {new:7.2f} ms ({change:+.0%}){marker}")
+            if change > threshold:
+                regressions.append((name, phase, change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless frame-time benchmarks for Dorm Dash")
+    parser.add_argument("--frames", type=int, default=600, help="timed frames per configuration")
+    parser.add_argument("--alloc-frames", type=int, default=120, help="frames traced for allocations")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", nargs="*", help="configuration names to run (default: all)")
+    parser.add_argument("--out", default="bench_results.json", help="where to save results")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p95 slowdown counted as a regression")
+    parser.add_argument("--renderer", choices=["software", "texture"], default="software", help="render backend")
+    parser.add_argument("--render-driver", help="SDL render driver for --renderer texture, e.g. software")
+    args = parser.parse_args()
+
+    configs = all_configs(Game(headless=True).max_level)
+    if args.only:
+        configs = {name: configs[name] for name in args.only}
+
+    results = run_suite(configs, args.frames, args.alloc_frames, args.seed, args.renderer, args.render_driver)
+    with open(args.out, "w") as f:
+        json.dump({"seed": args.seed, "frames": args.frames, "renderer": args.renderer,
+                   "results": results}, f, indent=2)
+    print(f"Saved {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
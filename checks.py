@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+# Checks never need a real window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from Finalproject import (Game, KeyState, DirtyRectRenderer, RewindBuffer, SoftwareDisplay, TextureDisplay,
+                          WIDTH, HEIGHT, GOLD, CRIMSON, state_checksum)
+
+RENDER_TOLERANCE = 8  # Per channel; blending rounds differently on the two paths
+MOVE_KEYS = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN]
+
+def scripted_keys(seed, ticks):
+    # A seeded random walk that changes direction every 30 ticks and
+    # sometimes holds R, so games end and restart along the way
+    rng = random.Random(seed)
+    keys = []
+    for tick in range(ticks):
+        if tick % 30 == 0:
+            pressed = {rng.choice(MOVE_KEYS), rng.choice(MOVE_KEYS)}
+            if rng.random() < 0.2:
+                pressed.add(pygame.K_r)
+            held = KeyState(pressed)
+        keys.append(held)
+    return keys
+
+def render_frames(seed=7):
+    # (name, build) pairs for frames both render backends must agree on
+    def play():
+        game = Game(seed=seed)
+        for _ in range(40):
+            game.update(KeyState({pygame.K_RIGHT, pygame.K_UP}))
+        return game
+
+    def burst():
+        # A victory-sized burst a few ticks in, still dense enough to overlap,
+        # set off clear of the player so it is not drawn over
+        game = play()
+        x, y = game.player.rect.center
+        game.add_particles(x + 150, y - 100, CRIMSON, game.particles.victory_burst)
+        for _ in range(5):
+            game.update(KeyState())
+        return game
+
+    def victory():
+        game = play()
+        game.game_over = game.won = True
+        return game
+
+    def fade(timer):
+        def build():
+            game = play()
+            game.game_over = True
+            game.fade_timer = timer
+            return game
+        return build
+
+    return [("play", play), ("burst", burst), ("victory", victory), ("fade", fade(20)), ("faded", fade(60))]
+
+def check_renderers():
+    # The texture backend on SDL's software render driver against the default
+    problems = []
+    software = SoftwareDisplay((WIDTH, HEIGHT), "checks")
+    texture = TextureDisplay((WIDTH, HEIGHT), "checks", "software")
+    for name, build in render_frames():
+        build().draw(software.screen)
+        expected = pygame.surfarray.array3d(software.screen).astype(np.int16)
+        build().draw(texture.screen)
+        actual = pygame.surfarray.array3d(texture.renderer.to_surface()).astype(np.int16)
+        texture.present()
+        difference = int(np.abs(expected - actual).max())
+        if difference > RENDER_TOLERANCE:
+            problems.append(f"{name}: texture frame differs by up to {difference} per channel")
+    return problems
+
+def check_save_restore(seed=11, ticks=6000, saves=(500, 2500, 4500)):
+    # A game restored from save_state() plays on exactly like the original,
+    # and a RewindBuffer hands back every snapshot pushed into it
+    problems = []
+    keys = scripted_keys(seed, ticks)
+    game = Game(headless=True, seed=seed)
+    rewind = RewindBuffer(seconds=ticks, rate=1)
+    states, checksums = [], []
+    for held in keys:
+        states.append(game.save_state())
+        rewind.push(game)
+        game.update(held)
+        checksums.append(state_checksum(game))
+
+    for tick in saves:
+        restored = Game(headless=True, seed=seed + 1)
+        restored.restore_state(states[tick])
+        for later in range(tick, ticks):
+            restored.update(keys[later])
+            if state_checksum(restored) != checksums[later]:
+                problems.append(f"game restored at tick {tick} diverged at tick {later + 1}")
+                break
+
+    for tick in range(ticks - 1, -1, -1):
+        if not rewind.rewind(game) or game.save_state() != states[tick]:
+            problems.append(f"rewinding to tick {tick} did not restore its snapshot")
+            break
+    return problems
+
+def check_backends(seed=5, ticks=2000, enemies=100):
+    # The array enemy backend plays out tick for tick like the objects one,
+    # on the fixed layouts and in a generated maze
+    problems = []
+    keys = scripted_keys(seed, ticks)
+    for maze_size in (None, (30, 30)):
+        games = []
+        for backend in ("objects", "array"):
+            game = Game(headless=True, enemy_backend=backend, maze_size=maze_size, seed=seed)
+            game.base_enemies = game.max_enemies = enemies
+            game.setup_game()
+            games.append(game)
+        objects, horde = games
+        for tick, held in enumerate(keys):
+            objects.update(held)
+            horde.update(held)
+            if state_checksum(objects) != state_checksum(horde):
+                problems.append(f"maze {maze_size}: array backend diverged at tick {tick + 1}")
+                break
+    return problems
+
+def check_dirty_rects(seed=3, ticks=800):
+    # Every frame DirtyRectRenderer patches up matches a full Game.draw()
+    problems = []
+    keys = scripted_keys(seed, ticks)
+    for maze_size in (None, (30, 20)):
+        game = Game(maze_size=maze_size, seed=seed)
+        renderer = DirtyRectRenderer()
+        patched = pygame.Surface((WIDTH, HEIGHT))
+        full = pygame.Surface((WIDTH, HEIGHT))
+        rng = random.Random(seed)
+        for tick, held in enumerate(keys):
+            game.update(held)
+            if tick % 7 == 0:
+                game.add_particles(rng.randint(50, 700), rng.randint(50, 500), GOLD, 5)
+            # None means it fell back to a full redraw, which needs no check
+            if renderer.draw(game, patched) is None or game.screen_shake:
+                continue
+            game.draw(full)
+            if patched.get_buffer().raw != full.get_buffer().raw:
+                problems.append(f"maze {maze_size}: dirty-rect frame differs from a full redraw at tick {tick + 1}")
+                break
+    return problems
+
+CHECKS = {
+    "renderers": check_renderers,
+    "save-restore": check_save_restore,
+    "backends": check_backends,
+    "dirty-rects": check_dirty_rects,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic checks of Dorm Dash invariants")
+    parser.add_argument("--only", nargs="*", choices=sorted(CHECKS), help="checks to run (default: all)")
+    args = parser.parse_args()
+
+    pygame.display.init()
+    failed = False
+    for name in args.only or CHECKS:
+        start = time.perf_counter()
+        problems = CHECKS[name]()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {'FAIL' if problems else 'ok':<4} ({elapsed:.1f} s)")
+        for problem in problems:
+            print(f"  {problem}")
+        failed = failed or bool(problems)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+
+# Environments render off screen, if at all
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from Finalproject import Game, KeyState, WIDTH, HEIGHT
+
+# Discrete actions: stand still, then the eight directions clockwise from up
+ACTIONS = [
+    KeyState(),
+    KeyState({pygame.K_UP}),
+    KeyState({pygame.K_UP, pygame.K_RIGHT}),
+    KeyState({pygame.K_RIGHT}),
+    KeyState({pygame.K_DOWN, pygame.K_RIGHT}),
+    KeyState({pygame.K_DOWN}),
+    KeyState({pygame.K_DOWN, pygame.K_LEFT}),
+    KeyState({pygame.K_LEFT}),
+    KeyState({pygame.K_UP, pygame.K_LEFT}),
+]
+
+TOKEN_REWARD = 1.0
+WIN_REWARD = 10.0
+CAUGHT_REWARD = -10.0
+
+class DormDashEnv:
+    # Gym-style wrapper around one Game: reset(seed) -> (obs, info) and
+    # step(action) -> (obs, reward, terminated, truncated, info).
+    #
+    # "state" observations are float32 vectors laid out as
+    #   player x, y | goal x, y | tokens left | max_enemies * (x, y, dx, dy, present)
+    #   | max_tokens * (x, y, present)
+    # with positions as fractions of the world size. "pixels" observations are
+    # the rendered screen as uint8 (WIDTH // scale, HEIGHT // scale, 3) arrays,
+    # indexed [x, y] like pygame.surfarray.
+    #
+    # Observations are written into one buffer per env that is reused by the
+    # next step; copy them if they must outlive it.
+    def __init__(self, observation="state", level=1, max_steps=3600, frame_skip=1,
+                 pixel_scale=4, enemy_backend="objects", maze_size=None):
+        if observation not in ("state", "pixels"):
+            raise ValueError(f"unknown observation type {observation!r}")
+        self.observation = observation
+        self.level = level
+        self.max_steps = max_steps
+        self.frame_skip = frame_skip
+        self.pixel_scale = pixel_scale
+        self.enemy_backend = enemy_backend
+        self.maze_size = maze_size
+        self.action_count = len(ACTIONS)
+        self.game = None
+        self.steps = 0
+        self.screen = pygame.Surface((WIDTH, HEIGHT)) if observation == "pixels" else None
+        self.max_enemies = Game.max_enemies
+        self.max_tokens = Game.max_tokens
+        self.observation_shape = self.make_buffer().shape
+
+    def make_buffer(self):
+        if self.observation == "pixels":
+            return np.zeros((-(-WIDTH // self.pixel_scale), -(-HEIGHT // self.pixel_scale), 3), dtype=np.uint8)
+        return np.zeros(5 + self.max_enemies * 5 + self.max_tokens * 3, dtype=np.float32)
+
+    def reset(self, seed=None, out=None):
+        # The Game is built on the first reset and reseeded after that, which
+        # skips the font and asset loading a new one would repeat
+        if self.game is None:
+            self.game = Game(headless=self.observation == "state", enemy_backend=self.enemy_backend,
+                             maze_size=self.maze_size, seed=seed, level=self.level)
+        else:
+            self.game.reset(seed, self.level)
+        self.steps = 0
+        self.buffer = self.make_buffer() if out is None else out
+        return self.observe(self.buffer), self.info()
+
+    def step(self, action, out=None):
+        game = self.game
+        keys = ACTIONS[action]
+        collected = game.tokens_collected
+        for _ in range(self.frame_skip):
+            game.update(keys)
+            if game.game_over:
+                break
+        self.steps += 1
+
+        reward = (game.tokens_collected - collected) * TOKEN_REWARD
+        if game.won:
+            reward += WIN_REWARD
+        elif game.game_over:
+            reward += CAUGHT_REWARD
+        terminated = game.game_over
+        truncated = not terminated and self.steps >= self.max_steps
+        return self.observe(self.buffer if out is None else out), reward, terminated, truncated, self.info()
+
+    def info(self):
+        game = self.game
+        return {"seed": game.seed, "level": game.level, "tokens": game.tokens_collected, "won": game.won}
+
+    def observe(self, out):
+        if self.observation == "pixels":
+            return self.render_pixels(out)
+        return self.fill_state(out)
+
+    def fill_state(self, out):
+        game = self.game
+        width, height = game.world.width, game.world.height
+        out.fill(0)
+        out[0:5] = (game.player.rect.x / width, game.player.rect.y / height,
+                    game.goal.x / width, game.goal.y / height, len(game.tokens) / self.max_tokens)
+
+        enemies = out[5:5 + self.max_enemies * 5].reshape(self.max_enemies, 5)
+        horde = game.horde
+        if horde is not None:
+            # Read straight from the horde's arrays rather than syncing objects
+            count = min(len(horde), self.max_enemies)
+            enemies[:count, 0] = horde.x[:count] / width
+            enemies[:count, 1] = horde.y[:count] / height
+            enemies[:count, 2] = horde.direction_x[:count] * horde.speed_boost[:count] / width
+            enemies[:count, 3] = horde.direction_y[:count] * horde.speed_boost[:count] / height
+        else:
+            count = min(len(game.enemies), self.max_enemies)
+            enemies[:count, :4] = [(enemy.rect.x / width, enemy.rect.y / height,
+                                    enemy.direction_x * enemy.speed_boost / width,
+                                    enemy.direction_y * enemy.speed_boost / height)
+                                   for enemy in game.enemies[:count]]
+        enemies[:count, 4] = 1
+
+        tokens = out[5 + self.max_enemies * 5:].reshape(self.max_tokens, 3)
+        count = min(len(game.tokens), self.max_tokens)
+        if count:
+            tokens[:count, :2] = [(token.rect.x / width, token.rect.y / height) for token in game.tokens[:count]]
+            tokens[:count, 2] = 1
+        return out
+
+    def render_pixels(self, out):
+        self.game.draw(self.screen)
+        # pixels3d is a view of the surface and the stride below is a view of
+        # that, so the only copy is the one into out
+        pixels = pygame.surfarray.pixels3d(self.screen)
+        np.copyto(out, pixels[::self.pixel_scale, ::self.pixel_scale])
+        del pixels  # Unlocks the surface for the next draw
+        return out
+
+class VectorEnv:
+    # Steps n independent DormDashEnvs per call. Observations, rewards and
+    # flags come back in preallocated batch arrays (reused by the next call),
+    # and envs that finish are reset straight away with the next seed, the
+    # final observation of the old episode going into infos[i]["final_observation"].
+    def __init__(self, count, **env_options):
+        self.envs = [DormDashEnv(**env_options) for _ in range(count)]
+        shape = self.envs[0].observation_shape
+        dtype = self.envs[0].make_buffer().dtype
+        self.observations = np.zeros((count, *shape), dtype=dtype)
+        self.rewards = np.zeros(count, dtype=np.float32)
+        self.terminated = np.zeros(count, dtype=bool)
+        self.truncated = np.zeros(count, dtype=bool)
+        self.next_seed = None
+
+    def __len__(self):
+        return len(self.envs)
+
+    def reset(self, seed=None):
+        # Env i starts from seed + i; later episodes keep counting up from there
+        infos = []
+        for i, env in enumerate(self.envs):
+            _, info = env.reset(None if seed is None else seed + i, out=self.observations[i])
+            infos.append(info)
+        self.next_seed = None if seed is None else seed + len(self.envs)
+        return self.observations, infos
+
+    def step(self, actions):
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, np.asarray(actions).tolist())):
+            observation = self.observations[i]
+            _, reward, terminated, truncated, info = env.step(action, out=observation)
+            self.rewards[i] = reward
+            self.terminated[i] = terminated
+            self.truncated[i] = truncated
+            if terminated or truncated:
+                info["final_observation"] = observation.copy()
+                seed = self.next_seed
+                if seed is not None:
+                    self.next_seed += 1
+                env.reset(seed, out=observation)
+            infos.append(info)
+        return self.observations, self.rewards, self.terminated, self.truncated, infos
@@ -0,0 +1,578 @@
+import os
+import sys
+import time
+import struct
+import random
+import asyncio
+import argparse
+from array import array
+from collections import OrderedDict
+
+import pygame
+from Finalproject import (Game, Player, Camera, KeyState, SPRITES, MASK_KEYS, NO_KEYS, SIM_RATE, WIDTH, HEIGHT,
+                          WHITE, DARK_OAK, OAK_BROWN, GREEN, RED, YELLOW, CRIMSON, GOLD, key_mask, percentile)
+
+DEFAULT_PORT = 47800
+SNAPSHOT_EVERY = 2  # Server ticks per snapshot (30 Hz at SIM_RATE 60)
+HISTORY = 64  # Snapshots kept as delta bases, on both ends
+INTERPOLATION_DELAY = 2 * SNAPSHOT_EVERY  # Ticks clients render behind the newest snapshot
+CLIENT_TIMEOUT = 5.0  # Seconds of silence before the server drops a client
+MAX_PLAYERS = 255
+
+MSG_JOIN, MSG_INPUT, MSG_LEAVE, MSG_WELCOME, MSG_SNAPSHOT = 1, 2, 3, 10, 11
+
+INPUT = struct.Struct("<BIIH")  # type, client sequence, newest snapshot tick received, key mask
+WELCOME = struct.Struct("<BBH")  # type, player id, tick rate
+SNAPSHOT_HEADER = struct.Struct("<BIIHB")  # type, tick, base tick (0 = full), level epoch, level
+RECT = struct.Struct("<hhhh")
+POINT = struct.Struct("<hh")
+COUNT8 = struct.Struct("<B")
+COUNT16 = struct.Struct("<H")
+PLAYER = struct.Struct("<BhhHH")  # id, x, y, score, times caught
+ENEMY_MOVE = struct.Struct("<Hhh")  # index, x, y
+TOKEN = struct.Struct("<Bhh")  # index, x, y
+
+class SharedGame(Game):
+    # One level played by several players at once. Enemies and tokens are the
+    # usual ones; a caught player goes back to the start, and the level moves
+    # on once every token is taken and someone reaches the goal. The single
+    # player Game.player only serves as the template start position.
+    def __init__(self, maze_size=None, seed=None, enemy_backend="objects"):
+        self.players = {}
+        self.scores = {}
+        self.catches = {}
+        self.epoch = 0
+        super().__init__(headless=True, enemy_backend=enemy_backend, maze_size=maze_size, seed=seed)
+
+    def setup_game(self):
+        super().setup_game()
+        # Tokens are named by their index in the level's original list
+        self.token_index = {id(token): index for index, token in enumerate(self.tokens)}
+        self.epoch = (self.epoch + 1) % 65536
+        for player in self.players.values():
+            player.reset_position()
+
+    def add_player(self, player_id):
+        player = Player()
+        player.start = self.player.start
+        player.reset_position()
+        self.players[player_id] = player
+        self.scores[player_id] = 0
+        self.catches[player_id] = 0
+
+    def remove_player(self, player_id):
+        del self.players[player_id]
+        del self.scores[player_id]
+        del self.catches[player_id]
+
+    def update(self, inputs):
+        for player_id, player in self.players.items():
+            player.move(inputs.get(player_id, NO_KEYS), self.wall_grid)
+
+        if self.horde is not None:
+            self.horde.update()
+        else:
+            for enemy in self.enemies:
+                enemy.update(self.wall_grid, self.play_area)
+                self.enemy_grid.move(enemy)
+
+        for player_id, player in self.players.items():
+            if self.horde is not None:
+                caught = self.horde.collides(player.rect)
+            else:
+                caught = any(player.rect.colliderect(enemy.rect) for enemy in self.enemy_grid.hits(player.rect))
+            if caught:
+                player.reset_position()
+                self.catches[player_id] += 1
+                continue
+            for token in self.token_grid.hits(player.rect):
+                self.tokens.remove(token)
+                self.token_grid.remove(token)
+                self.scores[player_id] += 1
+
+        if not self.tokens and any(player.rect.colliderect(self.goal) for player in self.players.values()):
+            self.level = min(self.level + 1, self.max_level)
+            self.setup_game()
+
+    def snapshot(self, tick):
+        players = {player_id: (player.rect.x, player.rect.y, self.scores[player_id], self.catches[player_id])
+                   for player_id, player in self.players.items()}
+        if self.horde is not None:
+            xs, ys = self.horde.x.tolist(), self.horde.y.tolist()
+        else:
+            xs = [enemy.rect.x for enemy in self.enemies]
+            ys = [enemy.rect.y for enemy in self.enemies]
+        enemies = array("h", [value for pair in zip(xs, ys) for value in pair])
+        tokens = frozenset(self.token_index[id(token)] for token in self.tokens)
+        return Snapshot(tick, self.epoch, self.level, players, enemies, tokens)
+
+    def level_info(self):
+        return LevelInfo(self.world.size, tuple(self.goal), [tuple(wall) for wall in self.walls],
+                         {self.token_index[id(token)]: token.rect.topleft for token in self.tokens},
+                         [enemy.rect.size for enemy in self.enemies])
+
+class Snapshot:
+    # What changes from tick to tick: players as id -> (x, y, score, catches),
+    # enemies as a flat x, y array, and the set of token indices still out
+    def __init__(self, tick, epoch, level, players, enemies, tokens):
+        self.tick = tick
+        self.epoch = epoch
+        self.level = level
+        self.players = players
+        self.enemies = enemies
+        self.tokens = tokens
+
+    def same_state(self, other):
+        return (self.epoch == other.epoch and self.players == other.players and
+                self.enemies == other.enemies and self.tokens == other.tokens)
+
+class LevelInfo:
+    # What stays fixed for a level, sent with full snapshots only
+    def __init__(self, world_size, goal, walls, token_positions, enemy_sizes):
+        self.world_size = world_size
+        self.goal = goal
+        self.walls = walls
+        self.token_positions = token_positions
+        self.enemy_sizes = enemy_sizes
+
+def encode_players(parts, snapshot, base):
+    changed = [(player_id, *state) for player_id, state in snapshot.players.items()
+               if base is None or base.players.get(player_id) != state]
+    parts.append(COUNT8.pack(len(changed)))
+    parts.extend(PLAYER.pack(*entry) for entry in changed)
+    removed = [] if base is None else [player_id for player_id in base.players if player_id not in snapshot.players]
+    parts.append(COUNT8.pack(len(removed)))
+    parts.extend(COUNT8.pack(player_id) for player_id in removed)
+
+def encode_snapshot(snapshot, base, level_info):
+    # A full snapshot when there is no usable base, otherwise only what
+    # differs from it: moved players and enemies, left players, taken tokens
+    if base is not None and base.epoch != snapshot.epoch:
+        base = None
+    parts = [SNAPSHOT_HEADER.pack(MSG_SNAPSHOT, snapshot.tick, base.tick if base else 0,
+                                  snapshot.epoch, snapshot.level)]
+    if base is None:
+        parts.append(POINT.pack(*level_info.world_size))
+        parts.append(RECT.pack(*level_info.goal))
+        parts.append(COUNT16.pack(len(level_info.walls)))
+        parts.extend(RECT.pack(*wall) for wall in level_info.walls)
+        parts.append(COUNT8.pack(len(snapshot.tokens)))
+        parts.extend(TOKEN.pack(index, *level_info.token_positions[index]) for index in sorted(snapshot.tokens))
+        enemies = snapshot.enemies
+        parts.append(COUNT16.pack(len(enemies) // 2))
+        parts.extend(RECT.pack(enemies[i * 2], enemies[i * 2 + 1], *size)
+                     for i, size in enumerate(level_info.enemy_sizes))
+        encode_players(parts, snapshot, None)
+    else:
+        encode_players(parts, snapshot, base)
+        new, old = snapshot.enemies, base.enemies
+        moved = [i for i in range(len(new) // 2) if new[i * 2] != old[i * 2] or new[i * 2 + 1] != old[i * 2 + 1]]
+        parts.append(COUNT16.pack(len(moved)))
+        parts.extend(ENEMY_MOVE.pack(i, new[i * 2], new[i * 2 + 1]) for i in moved)
+        taken = sorted(base.tokens - snapshot.tokens)
+        parts.append(COUNT8.pack(len(taken)))
+        parts.extend(COUNT8.pack(index) for index in taken)
+    return b"".join(parts)
+
+def decode_snapshot(data, bases, levels):
+    # Inverse of encode_snapshot(). bases maps tick -> Snapshot for the
+    # deltas; levels maps epoch -> LevelInfo and gains new levels' entries.
+    # Returns None for a delta whose base is gone.
+    _, tick, base_tick, epoch, level = SNAPSHOT_HEADER.unpack_from(data)
+    offset = SNAPSHOT_HEADER.size
+
+    def read(fmt):
+        nonlocal offset
+        values = fmt.unpack_from(data, offset)
+        offset += fmt.size
+        return values
+
+    if base_tick == 0:
+        world_size = read(POINT)
+        goal = read(RECT)
+        walls = [read(RECT) for _ in range(read(COUNT16)[0])]
+        token_positions = {}
+        for _ in range(read(COUNT8)[0]):
+            index, x, y = read(TOKEN)
+            token_positions[index] = (x, y)
+        enemies, sizes = array("h"), []
+        for _ in range(read(COUNT16)[0]):
+            x, y, w, h = read(RECT)
+            enemies.extend((x, y))
+            sizes.append((w, h))
+        levels[epoch] = LevelInfo(world_size, goal, walls, token_positions, sizes)
+        players = {}
+        tokens = frozenset(token_positions)
+    else:
+        base = bases.get(base_tick)
+        if base is None or base.epoch != epoch:
+            return None
+        players = dict(base.players)
+        enemies = array("h", base.enemies)
+        tokens = base.tokens
+
+    for _ in range(read(COUNT8)[0]):
+        player_id, x, y, score, catches = read(PLAYER)
+        players[player_id] = (x, y, score, catches)
+    for _ in range(read(COUNT8)[0]):
+        players.pop(read(COUNT8)[0], None)
+    if base_tick != 0:
+        for _ in range(read(COUNT16)[0]):
+            index, x, y = read(ENEMY_MOVE)
+            enemies[index * 2] = x
+            enemies[index * 2 + 1] = y
+        taken = {read(COUNT8)[0] for _ in range(read(COUNT8)[0])}
+        tokens = tokens - taken
+    return Snapshot(tick, epoch, level, players, enemies, tokens)
+
+class RemoteClient:
+    def __init__(self, player_id, address):
+        self.player_id = player_id
+        self.address = address
+        self.keys = NO_KEYS
+        self.sequence = 0
+        self.ack = None  # Newest snapshot tick the client has confirmed
+        self.last_heard = time.perf_counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.snapshots_sent = 0
+        self.full_snapshots = 0
+
+class GameServer(asyncio.DatagramProtocol):
+    # Authoritative SharedGame ticking at SIM_RATE. Clients send their held
+    # keys with the newest snapshot tick they have; every SNAPSHOT_EVERY
+    # ticks each client gets a delta against that acknowledged snapshot.
+    def __init__(self, game, snapshot_every=SNAPSHOT_EVERY):
+        self.game = game
+        self.snapshot_every = snapshot_every
+        self.clients = {}  # address -> RemoteClient
+        self.history = OrderedDict()  # tick -> Snapshot
+        self.level_info = None
+        self.level_epoch = None
+        self.transport = None
+        self.tick = 0
+        self.tick_times = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        client = self.clients.get(address)
+        kind = data[0] if data else None
+        if kind == MSG_JOIN:
+            if client is None:
+                player_id = self.free_player_id()
+                if player_id is None:
+                    return
+                client = self.clients[address] = RemoteClient(player_id, address)
+                self.game.add_player(player_id)
+            self.send(client, WELCOME.pack(MSG_WELCOME, client.player_id, SIM_RATE))
+        elif client is None:
+            return
+        elif kind == MSG_INPUT and len(data) == INPUT.size:
+            _, sequence, ack, mask = INPUT.unpack(data)
+            client.last_heard = time.perf_counter()
+            client.bytes_received += len(data)
+            if sequence > client.sequence:  # Drop stale, reordered input
+                client.sequence = sequence
+                client.keys = MASK_KEYS[mask & (len(MASK_KEYS) - 1)]
+            if ack and (client.ack is None or ack > client.ack):
+                client.ack = ack
+        elif kind == MSG_LEAVE:
+            self.drop(client)
+
+    def free_player_id(self):
+        used = {client.player_id for client in self.clients.values()}
+        return next((player_id for player_id in range(1, MAX_PLAYERS + 1) if player_id not in used), None)
+
+    def drop(self, client):
+        del self.clients[client.address]
+        self.game.remove_player(client.player_id)
+
+    def send(self, client, data):
+        self.transport.sendto(data, client.address)
+        client.bytes_sent += len(data)
+
+    def step(self):
+        start = time.perf_counter()
+        for client in [c for c in self.clients.values() if start - c.last_heard > CLIENT_TIMEOUT]:
+            self.drop(client)
+
+        game = self.game
+        game.update({client.player_id: client.keys for client in self.clients.values()})
+        self.tick += 1
+
+        if self.tick % self.snapshot_every == 0:
+            snapshot = game.snapshot(self.tick)
+            if game.epoch != self.level_epoch:
+                self.level_info = game.level_info()
+                self.level_epoch = game.epoch
+            self.history[self.tick] = snapshot
+            while len(self.history) > HISTORY:
+                self.history.popitem(last=False)
+            # Clients acknowledging the same tick share one encoded delta
+            encoded = {}
+            for client in self.clients.values():
+                base_tick = client.ack if client.ack in self.history else None
+                data = encoded.get(base_tick)
+                if data is None:
+                    base = self.history[base_tick] if base_tick is not None else None
+                    data = encoded[base_tick] = encode_snapshot(snapshot, base, self.level_info)
+                self.send(client, data)
+                client.snapshots_sent += 1
+                if data[5:9] == b"\0\0\0\0":
+                    client.full_snapshots += 1
+        self.tick_times.append(time.perf_counter() - start)
+
+    async def run(self, duration=None):
+        interval = 1 / SIM_RATE
+        next_tick = time.perf_counter()
+        end = None if duration is None else next_tick + duration
+        while end is None or next_tick < end:
+            self.step()
+            next_tick += interval
+            await asyncio.sleep(max(0, next_tick - time.perf_counter()))
+
+class GameClient(asyncio.DatagramProtocol):
+    # Thin client: sends held keys, rebuilds snapshots from deltas and draws
+    # them interpolated INTERPOLATION_DELAY ticks in the past, so motion is
+    # smooth even though snapshots arrive at a fraction of the frame rate.
+    def __init__(self):
+        self.transport = None
+        self.player_id = None
+        self.snapshots = OrderedDict()  # tick -> Snapshot, oldest first
+        self.levels = {}  # epoch -> LevelInfo
+        self.latest = None
+        self.latest_time = None
+        self.sequence = 0
+        self.bytes_received = 0
+        self.undecodable = 0
+        self.camera = None
+        self.font = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.sendto(bytes([MSG_JOIN]))
+
+    def datagram_received(self, data, address):
+        self.bytes_received += len(data)
+        if data[0] == MSG_WELCOME:
+            self.player_id = WELCOME.unpack(data)[1]
+        elif data[0] == MSG_SNAPSHOT:
+            snapshot = decode_snapshot(data, self.snapshots, self.levels)
+            if snapshot is None:
+                self.undecodable += 1
+                return
+            if self.latest is not None and snapshot.tick <= self.latest.tick:
+                return  # Arrived out of order; a newer one is already in
+            self.snapshots[snapshot.tick] = snapshot
+            while len(self.snapshots) > HISTORY:
+                self.snapshots.popitem(last=False)
+            self.latest = snapshot
+            self.latest_time = time.perf_counter()
+
+    def send_input(self, keys):
+        if self.player_id is None:
+            self.transport.sendto(bytes([MSG_JOIN]))
+            return
+        self.sequence += 1
+        ack = self.latest.tick if self.latest else 0
+        self.transport.sendto(INPUT.pack(MSG_INPUT, self.sequence, ack, key_mask(keys)))
+
+    def leave(self):
+        self.transport.sendto(bytes([MSG_LEAVE]))
+
+    def render_tick(self, now=None):
+        # Server time being shown: newest tick, advanced by the time since it
+        # arrived, minus the interpolation delay
+        now = time.perf_counter() if now is None else now
+        return self.latest.tick + (now - self.latest_time) * SIM_RATE - INTERPOLATION_DELAY
+
+    def interpolated(self, tick):
+        # (players, enemies, tokens, level info) at a fractional server tick.
+        # Positions blend between the snapshots either side of it; across a
+        # level change, or outside the buffer, the nearest snapshot is used.
+        before = after = None
+        for snapshot in reversed(self.snapshots.values()):
+            if snapshot.tick <= tick:
+                before = snapshot
+                break
+            after = snapshot
+        if before is None:
+            before = after
+        if after is None or after.epoch != before.epoch or after.tick == before.tick:
+            after, t = before, 0.0
+        else:
+            t = (tick - before.tick) / (after.tick - before.tick)
+
+        def blend(a, b):
+            return round(a + (b - a) * t)
+
+        players = {}
+        for player_id, (x, y, score, catches) in after.players.items():
+            old = before.players.get(player_id)
+            if old is not None:
+                x, y = blend(old[0], x), blend(old[1], y)
+            players[player_id] = (x, y, score, catches)
+        enemies = [(blend(a, b), blend(c, d)) for a, c, b, d in
+                   zip(before.enemies[0::2], before.enemies[1::2], after.enemies[0::2], after.enemies[1::2])]
+        return players, enemies, after.tokens, self.levels[after.epoch]
+
+    def draw(self, screen):
+        if self.latest is None:
+            screen.fill(DARK_OAK)
+            return
+        players, enemies, tokens, level = self.interpolated(self.render_tick())
+        world = pygame.Rect((0, 0), level.world_size)
+        if self.camera is None or self.camera.world != world:
+            self.camera = Camera(world)
+        own = players.get(self.player_id)
+        if own is not None:
+            self.camera.follow(pygame.Rect(own[0], own[1], 40, 40))
+        ox, oy = self.camera.offset
+        view = self.camera.cull_rect()
+
+        screen.fill(OAK_BROWN)
+        walls = [pygame.Rect(wall) for wall in level.walls]
+        for wall in walls:
+            if view.colliderect(wall):
+                pygame.draw.rect(screen, DARK_OAK, wall.move(ox + 2, oy + 2))
+        for wall in walls:
+            if view.colliderect(wall):
+                pygame.draw.rect(screen, WHITE, wall.move(ox, oy))
+        goal = pygame.Rect(level.goal)
+        pygame.draw.rect(screen, DARK_OAK, goal.inflate(6, 6).move(ox, oy))
+        pygame.draw.rect(screen, GREEN, goal.move(ox, oy))
+
+        batch = []
+        for index in tokens:
+            x, y = level.token_positions[index]
+            batch.append((SPRITES.bordered(20, 20, YELLOW, DARK_OAK, 1), (x + ox - 1, y + oy - 1)))
+        for (x, y), (w, h) in zip(enemies, level.enemy_sizes):
+            batch.append((SPRITES.bordered(w, h, RED, DARK_OAK, 1), (x + ox - 1, y + oy - 1)))
+        for player_id, (x, y, _, _) in players.items():
+            color = CRIMSON if player_id == self.player_id else GOLD
+            batch.append((SPRITES.bordered(40, 40, color, DARK_OAK, 2), (x + ox - 2, y + oy - 2)))
+        screen.blits(batch, False)
+
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 24)
+        scores = "  ".join(f"P{player_id}: {score}" + (" (you)" if player_id == self.player_id else "")
+                           for player_id, (_, _, score, _) in sorted(players.items()))
+        screen.blit(self.font.render(scores, True, WHITE), (20, 20))
+
+async def serve(host, port, maze_size=None, seed=None):
+    loop = asyncio.get_running_loop()
+    server = GameServer(SharedGame(maze_size=maze_size, seed=seed))
+    transport, _ = await loop.create_datagram_endpoint(lambda: server, local_addr=(host, port))
+    print(f"Serving on {host}:{port}")
+    try:
+        await server.run()
+    finally:
+        transport.close()
+
+async def play(host, port):
+    # A windowed client driven by the keyboard
+    loop = asyncio.get_running_loop()
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Dorm Dash - multiplayer")
+    client = GameClient()
+    transport, _ = await loop.create_datagram_endpoint(lambda: client, remote_addr=(host, port))
+    try:
+        running = True
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+            client.send_input(pygame.key.get_pressed())
+            client.draw(screen)
+            pygame.display.flip()
+            await asyncio.sleep(1 / SIM_RATE)
+        client.leave()
+    finally:
+        transport.close()
+        pygame.quit()
+
+async def benchmark(clients, seconds, maze_size=None, seed=1, port=0):
+    # Server and bot clients in one process over loopback. Bots random-walk,
+    # send input every tick and render-interpolate every frame off screen.
+    loop = asyncio.get_running_loop()
+    server = GameServer(SharedGame(maze_size=maze_size, seed=seed))
+    server_transport, _ = await loop.create_datagram_endpoint(lambda: server, local_addr=("127.0.0.1", port))
+    address = server_transport.get_extra_info("sockname")
+
+    bots = []
+    for _ in range(clients):
+        client = GameClient()
+        transport, _ = await loop.create_datagram_endpoint(lambda: client, remote_addr=address)
+        bots.append((client, transport))
+
+    moves = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN]
+    surface = pygame.Surface((WIDTH, HEIGHT))
+
+    async def drive(client, rng):
+        keys = NO_KEYS
+        frame = 0
+        while True:
+            if frame % 30 == 0:
+                keys = KeyState({rng.choice(moves), rng.choice(moves)})
+            client.send_input(keys)
+            if client.latest is not None:
+                client.interpolated(client.render_tick())
+            frame += 1
+            await asyncio.sleep(1 / SIM_RATE)
+
+    drivers = [asyncio.ensure_future(drive(client, random.Random(seed + i))) for i, (client, _) in enumerate(bots)]
+    await server.run(seconds)
+    for driver in drivers:
+        driver.cancel()
+
+    # Every client's newest snapshot must match what the server had at that tick
+    mismatched = sum(1 for client, _ in bots
+                     if client.latest is None or client.latest.tick not in server.history or
+                     not client.latest.same_state(server.history[client.latest.tick]))
+    bots[0][0].draw(surface)
+
+    tick_ms = [t * 1000 for t in server.tick_times]
+    print(f"{clients} clients, {seconds:.0f} s, {server.tick} ticks, {len(server.game.enemies)} enemies")
+    print(f"server tick  mean {sum(tick_ms) / len(tick_ms):.3f} ms  p95 {percentile(tick_ms, 0.95):.3f} ms  "
+          f"p99 {percentile(tick_ms, 0.99):.3f} ms")
+    for client in server.clients.values():
+        snapshots = max(1, client.snapshots_sent)
+        print(f"player {client.player_id:>2}  down {client.bytes_sent / seconds / 1024:6.2f} KB/s  "
+              f"up {client.bytes_received / seconds / 1024:5.2f} KB/s  "
+              f"{client.bytes_sent / snapshots:6.1f} B/snapshot  {client.full_snapshots} full")
+    print(f"clients whose state matches the server: {clients - mismatched}/{clients}")
+
+    for client, transport in bots:
+        client.leave()
+        transport.close()
+    server_transport.close()
+    return mismatched
+
+def main():
+    parser = argparse.ArgumentParser(description="Dorm Dash over UDP: authoritative server, thin clients")
+    parser.add_argument("mode", choices=["server", "client", "bench"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--maze", type=int, nargs=2, metavar=("COLS", "ROWS"), help="play a generated maze")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--clients", type=int, default=8, help="bench: bot clients")
+    parser.add_argument("--seconds", type=float, default=10, help="bench: run time")
+    args = parser.parse_args()
+
+    maze_size = tuple(args.maze) if args.maze else None
+    if args.mode != "client":
+        # Only the client opens a real window; the server and bench never draw
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    if args.mode == "server":
+        asyncio.run(serve(args.host, args.port, maze_size, args.seed))
+    elif args.mode == "client":
+        asyncio.run(play(args.host, args.port))
+    elif asyncio.run(benchmark(args.clients, args.seconds, maze_size, args.seed or 1, 0)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import time
+import math
+import random
+import argparse
+import multiprocessing
+from collections import Counter, defaultdict
+
+# Bots play without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from Finalproject import Game, KeyState, DistanceField, SIM_RATE, GRID_SIZE, percentile
+
+STUCK_TICKS = 20  # Ticks without moving before the bot tries a different step
+
+class TokenBot:
+    # Walks down a distance field built from its target: the nearest token
+    # while any are left, then the goal. One field per target per level.
+    # The cautious variant also steps away from nearby enemies.
+    def __init__(self, seed, cautious=False, caution_radius=90):
+        self.cautious = cautious
+        self.caution_radius = caution_radius
+        self.rng = random.Random(seed)  # Only breaks ties and unsticks
+        self.fields = {}
+        self.walls = None
+        self.last_position = None
+        self.still = 0
+
+    def field(self, game, target):
+        if game.walls is not self.walls:
+            self.walls = game.walls
+            self.fields.clear()
+        key = tuple(target)
+        if key not in self.fields:
+            self.fields[key] = DistanceField(game.walls, game.world, pygame.Rect(target))
+        return self.fields[key]
+
+    def target(self, game):
+        if not game.tokens:
+            return game.goal
+        x, y = game.player.rect.center
+        return min(game.tokens, key=lambda token: (token.rect.centerx - x)**2 + (token.rect.centery - y)**2).rect
+
+    def enemy_penalty(self, game, x, y):
+        penalty = 0
+        radius = self.caution_radius
+        nearby = pygame.Rect(x - radius, y - radius, radius * 2, radius * 2)
+        for enemy in game.enemy_grid.hits(nearby):
+            gap = math.hypot(enemy.rect.centerx - x, enemy.rect.centery - y)
+            if gap < radius:
+                penalty += (radius - gap) * 4
+        return penalty
+
+    def __call__(self, game, tick):
+        field = self.field(game, self.target(game))
+        step = field.step
+        x, y = game.player.rect.center
+        col, row = x // step, y // step
+
+        position = game.player.rect.topleft
+        self.still = self.still + 1 if position == self.last_position else 0
+        self.last_position = position
+
+        # Score every neighbouring node by path length (and enemy danger)
+        choices = []
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                c, r = col + dc, row + dr
+                if not (0 <= c < field.cols and 0 <= r < field.rows):
+                    continue
+                distance = field.distances[r * field.cols + c]
+                if distance < 0:
+                    continue
+                node_x, node_y = c * step + step // 2, r * step + step // 2
+                score = distance * step
+                if self.cautious:
+                    score += self.enemy_penalty(game, node_x, node_y)
+                choices.append((score, self.rng.random(), node_x, node_y))
+        if not choices:
+            return KeyState()
+        choices.sort()
+        if self.still > STUCK_TICKS:
+            # Pressed against a corner; try another of the better steps
+            _, _, node_x, node_y = self.rng.choice(choices[:3])
+        else:
+            _, _, node_x, node_y = choices[0]
+        if node_x == x and node_y == y:
+            node_x, node_y = self.target(game).center
+
+        pressed = set()
+        if node_x < x - 1:
+            pressed.add(pygame.K_LEFT)
+        elif node_x > x + 1:
+            pressed.add(pygame.K_RIGHT)
+        if node_y < y - 1:
+            pressed.add(pygame.K_UP)
+        elif node_y > y + 1:
+            pressed.add(pygame.K_DOWN)
+        return KeyState(pressed)
+
+POLICIES = {
+    "greedy": lambda seed: TokenBot(seed),
+    "cautious": lambda seed: TokenBot(seed, cautious=True),
+}
+
+def play_game(task):
+    # One seeded game on one level, stopped when it ends or time runs out
+    level, seed, policy_name, max_ticks = task
+    game = Game(headless=True, seed=seed)
+    game.level = level
+    game.setup_game()
+    policy = POLICIES[policy_name](seed)
+    tick = 0
+    while not game.game_over and tick < max_ticks:
+        game.update(policy(game, tick))
+        tick += 1
+
+    result = {"level": level, "seed": seed, "layout": game.current_maze, "ticks": tick,
+              "won": game.won, "caught": game.game_over and not game.won,
+              "tokens": game.tokens_collected, "token_count": game.get_current_token_count()}
+    if result["caught"]:
+        result["death"] = game.player.rect.center
+    return result
+
+def summarize(results, top_deaths=5):
+    groups = defaultdict(list)
+    for result in results:
+        groups[(result["level"], result["layout"])].append(result)
+
+    summary = []
+    for (level, layout), games in sorted(groups.items()):
+        wins = [game["ticks"] / SIM_RATE for game in games if game["won"]]
+        deaths = Counter((x // GRID_SIZE, y // GRID_SIZE) for x, y in
+                         (game["death"] for game in games if game["caught"]))
+        summary.append({
+            "level": level,
+            "layout": layout,
+            "games": len(games),
+            "win_rate": len(wins) / len(games),
+            "caught_rate": sum(game["caught"] for game in games) / len(games),
+            "timeout_rate": sum(not game["won"] and not game["caught"] for game in games) / len(games),
+            "tokens_per_game": sum(game["tokens"] for game in games) / len(games),
+            "clear_seconds_p50": percentile(wins, 0.50) if wins else None,
+            "clear_seconds_p90": percentile(wins, 0.90) if wins else None,
+            # Grid cells (GRID_SIZE px) where the bot was caught most often
+            "death_cells": [{"cell": list(cell), "deaths": count} for cell, count in deaths.most_common(top_deaths)],
+        })
+    return summary
+
+def print_summary(summary):
+    print(f"{'level':>5} {'layout':>6} {'games':>6} {'win':>6} {'caught':>7} {'timeout':>8} "
+          f"{'clear p50':>10} {'p90':>7}  most deaths (cell: count)")
+    for row in summary:
+        p50 = f"{row['clear_seconds_p50']:.1f}s" if row["clear_seconds_p50"] is not None else "-"
+        p90 = f"{row['clear_seconds_p90']:.1f}s" if row["clear_seconds_p90"] is not None else "-"
+        deaths = ", ".join(f"{cell['cell'][0]},{cell['cell'][1]}: {cell['deaths']}" for cell in row["death_cells"][:3])
+        print(f"{row['level']:>5} {row['layout']:>6} {row['games']:>6} {row['win_rate']:>6.1%} "
+              f"{row['caught_rate']:>7.1%} {row['timeout_rate']:>8.1%} {p50:>10} {p90:>7}  {deaths}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many seeded Dorm Dash games with bots across all cores")
+    parser.add_argument("--games", type=int, default=1000, help="games per level")
+    parser.add_argument("--levels", type=int, nargs="*", help="levels to play (default: all)")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="cautious")
+    parser.add_argument("--seed", type=int, default=0, help="first game seed")
+    parser.add_argument("--max-seconds", type=float, default=90, help="game time before a game counts as a timeout")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--out", default="playtest_results.json", help="where to save the summary")
+    args = parser.parse_args()
+
+    levels = args.levels or list(range(1, Game(headless=True).max_level + 1))
+    max_ticks = int(args.max_seconds * SIM_RATE)
+    tasks = [(level, args.seed + index, args.policy, max_ticks)
+             for level in levels for index in range(args.games)]
+
+    start = time.perf_counter()
+    results = []
+    with multiprocessing.Pool(args.processes) as pool:
+        # Games vary a lot in length, so hand them out in small batches
+        chunksize = max(1, len(tasks) // (args.processes * 16))
+        for result in pool.imap_unordered(play_game, tasks, chunksize):
+            results.append(result)
+            if len(results) % 500 == 0:
+                print(f"{len(results)}/{len(tasks)} games", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"Played {len(results)} games in {elapsed:.1f} s on {args.processes} processes "
+          f"({len(results) / elapsed:.1f} games/s)")
+
+    summary = summarize(results)
+    print_summary(summary)
+    with open(args.out, "w") as f:
+        json.dump({"policy": args.policy, "seed": args.seed, "games_per_level": args.games,
+                   "max_seconds": args.max_seconds, "summary": summary}, f, indent=2)
+    print(f"Saved {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+import argparse
+
+# Replays never open a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from Finalproject import InputRecording, SIM_RATE, replay
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a Dorm Dash recording headless and check it still matches")
+    parser.add_argument("recording", help="file saved by Finalproject.py --record PATH")
+    parser.add_argument("--backend", choices=["objects", "array"],
+                        default="objects", help="enemy update backend")
+    args = parser.parse_args()
+
+    recording = InputRecording.load(args.recording)
+    print(f"seed {recording.seed}, {recording.ticks} ticks ({recording.ticks / SIM_RATE / 60:.1f} min played), "
+          f"{len(recording.masks)} key runs, {len(recording.checksums)} checksums")
+
+    start = time.perf_counter()
+    game, diverged = replay(recording, args.backend)
+    elapsed = time.perf_counter() - start
+    print(f"replayed in {elapsed:.2f} s ({recording.ticks / elapsed:,.0f} ticks/s), "
+          f"ended on level {game.level} with {game.tokens_collected} tokens")
+
+    if diverged is not None:
+        print(f"DIVERGED: state checksum differs at tick {diverged}")
+        sys.exit(1)
+    print("OK: every checksum matched")
+
+if __name__ == "__main__":
+    main()